@@ -0,0 +1,471 @@
+# benchmarks.py
+"""
+Micro-benchmarks des étapes du pipeline.
+Utilisation : python benchmarks.py <nom> [<nom> ...]  (ou "all")
+"""
+import os
+import time
+import wave
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+from utility_functions import format_message
+
+
+def print_result(name, seconds, detail=""):
+    """Affiche le résultat d'une mesure."""
+    print(format_message(f"{name:<40} {seconds * 1000:10.1f} ms  {detail}", "RÉUSSI"))
+
+
+def timed(function, *args, repeat=1, **kwargs):
+    """
+    Mesure la meilleure durée d'exécution d'une fonction sur plusieurs essais.
+    :return: Tuple (durée en secondes, valeur renvoyée par le dernier appel).
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def write_test_wave(file_path, seconds, sample_rate=44100, channels=1, silence=0.5):
+    """
+    Écrit un fichier WAV 16 bits de test : une voyelle synthétique entourée de silence.
+    :param seconds: Durée du signal non silencieux.
+    :param silence: Durée du silence ajouté avant et après (en secondes).
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = 0.5 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 440 * t)
+    pad = np.zeros(int(silence * sample_rate))
+    signal = np.concatenate([pad, voice, pad])
+    samples = (np.repeat(signal[:, None], channels, axis=1) * 32767 * 0.8).astype("<i2")
+    with wave.open(file_path, "wb") as wav_out:
+        wav_out.setnchannels(channels)
+        wav_out.setsampwidth(2)
+        wav_out.setframerate(sample_rate)
+        wav_out.writeframes(samples.tobytes())
+    return file_path
+
+
+def import_time(module):
+    """
+    Mesure l'import d'un module dans un interpréteur neuf avec -X importtime.
+    :return: Tuple (durée cumulée de l'import en secondes, ensemble des modules importés).
+    """
+    import sys
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # Format : "import time: <self us> | <cumulative us> | <module>"
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total)
+    return cumulative.get(module, 0) / 1e6, set(cumulative)
+
+
+def bench_import_time(work_dir, modules=("main", "cli", "pipeline_runner", "utility_functions")):
+    """
+    Démarrage à froid : durée d'import des points d'entrée (-X importtime) et modules lents
+    effectivement chargés. Un lancement du CLI ne devrait charger ni PyQt6 ni librosa.
+    """
+    import sys
+    import subprocess
+
+    heavy = ("PyQt6", "librosa", "pydub", "replicate", "tqdm", "soundfile", "mido", "numpy")
+    for module in modules:
+        seconds, loaded = import_time(module)
+        print_result(f"import {module}", seconds, "chargés : " + (", ".join(m for m in heavy if m in loaded) or "aucun"))
+
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    seconds, _ = timed(
+        subprocess.run, [sys.executable, "-W", "ignore", main_file, "--help"], stdout=subprocess.DEVNULL, repeat=3
+    )
+    print_result("python main.py --help", seconds, "(interpréteur compris)")
+
+
+def bench_replicate_async(work_dir, lines=16, latency=0.5, concurrency=8):
+    """Transformations RVC séquentielles et concurrentes contre le serveur de prédictions factice."""
+    from fake_replicate_server import FakePredictionsServer
+    from replicate_async import AsyncReplicateClient
+
+    inputs = [write_test_wave(os.path.join(work_dir, f"in_{i}.wav"), 1.0) for i in range(lines)]
+    with FakePredictionsServer(latency=latency) as server:
+        for max_concurrency in (1, concurrency):
+            client = AsyncReplicateClient(
+                token="fake", base_url=server.base_url, max_concurrency=max_concurrency, poll_interval=0.05
+            )
+            jobs = [(path, f"{path}.out_{max_concurrency}.wav", {}) for path in inputs]
+            seconds, _ = timed(lambda: asyncio.run(client.transform_many("fake:version", jobs)))
+            print_result(
+                f"replicate-async concurrence={max_concurrency}", seconds,
+                f"({lines} lignes, latence {latency:.1f} s, max en vol {server.max_in_flight})"
+            )
+
+
+def bench_synth_overhead(work_dir, lines=10):
+    """
+    Coût par ligne de la synthèse midi2voice : `python -m midi2voice` lancé pour chaque ligne
+    (ancien mode "subprocess") contre synthesis.synthesize_voice dans le processus courant
+    (mode "inprocess"). Dans les deux modes, MuseScore et la requête Sinsy sont remplacés par la
+    même copie de fichiers préparés : seuls le démarrage, les imports et le travail de midi2voice
+    (lecture du MIDI par music21, découpage des paroles, balises de voix) sont mesurés.
+    """
+    import sys
+    import subprocess
+    from synthesis import midi2voice_available
+
+    def spawn(args, cwd=None):
+        for _ in range(lines):
+            subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL, cwd=cwd)
+
+    seconds, _ = timed(spawn, ["-c", "pass"])
+    print_result("interpréteur seul (subprocess)", seconds / lines, "par ligne")
+
+    if not midi2voice_available():
+        print(format_message("midi2voice n'est pas installé : mesure de la synthèse ignorée.", "INFO"))
+        return
+
+    import synthesis
+    import midi2voice
+    from music21 import converter
+
+    midi_file = write_test_midi(os.path.join(work_dir, "line.mid"), tracks=1, notes_per_track=24)
+    lyrics = "hello world this is a line of lyrics for the benchmark"
+    lyrics_file = os.path.join(work_dir, "line.txt")
+    with open(lyrics_file, "w", encoding="utf-8") as f:
+        f.write(lyrics + "\n")
+    # Sorties préparées de MuseScore (MusicXML) et de Sinsy (WAV), recopiées par les remplaçants
+    musicxml_file = os.path.join(work_dir, "line.musicxml")
+    converter.parse(midi_file).write("musicxml", fp=musicxml_file)
+    sinsy_wave = write_test_wave(os.path.join(work_dir, "sinsy.wav"), 1.0)
+    stubs = (
+        # midi2voice.midi2xml désigne la fonction réexportée par le paquet : le module est pris dans sys.modules
+        "import sys, shutil, midi2voice\n"
+        "sys.modules['midi2voice.midi2xml'].create_music_xml = "
+        f"lambda midi_path, xml_path: shutil.copy({musicxml_file!r}, xml_path)\n"
+        f"midi2voice.sinsy_request = lambda xml_path, wav_path, sex: shutil.copy({sinsy_wave!r}, wav_path)\n"
+    )
+
+    run_module = "import runpy, sys; sys.argv[0] = 'midi2voice'; runpy.run_module('midi2voice', run_name='__main__')"
+    seconds, _ = timed(
+        spawn, ["-c", stubs + run_module, "-l", lyrics_file, "-m", midi_file, "-g", "male", "-t", "120"], work_dir
+    )
+    print_result("python -m midi2voice (subprocess)", seconds / lines, "par ligne")
+
+    midi2xml_module = sys.modules["midi2voice.midi2xml"]
+    originals = (synthesis.midi_to_musicxml, midi2xml_module.create_music_xml, midi2voice.sinsy_request)
+    exec(stubs, {})
+    synthesis.midi_to_musicxml = midi2xml_module.create_music_xml
+    output_wave = os.path.join(work_dir, "voice.wav")
+
+    def synthesize():
+        for _ in range(lines):
+            synthesis.synthesize_voice(midi_file, lyrics, output_wave, 120, work_dir=work_dir)
+
+    try:
+        synthesis.synthesize_voice(midi_file, lyrics, output_wave, 120, work_dir=work_dir)  # imports, payés une fois
+        seconds, _ = timed(synthesize)
+    finally:
+        synthesis.midi_to_musicxml, midi2xml_module.create_music_xml, midi2voice.sinsy_request = originals
+    print_result("synthesize_voice (inprocess)", seconds / lines, "par ligne")
+
+
+def bench_silence_trim(work_dir, minutes=3.0, channels=2):
+    """Suppression des silences : version NumPy contre pydub.silence.detect_nonsilent."""
+    import io
+    import contextlib
+    from utility_functions import remove_silence, remove_silence_pydub
+
+    input_file = write_test_wave(os.path.join(work_dir, "trim_in.wav"), minutes * 60, channels=channels)
+    for name, function in (("pydub", remove_silence_pydub), ("numpy", remove_silence)):
+        output_file = os.path.join(work_dir, f"trim_{name}.wav")
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, _ = timed(function, input_file, output_file)
+        print_result(f"silence-trim {name}", seconds, f"({minutes:.0f} min, {channels} canaux)")
+
+
+def bench_time_stretch(work_dir, minutes=5.0, channels=2, ratio=1.1):
+    """Étirement temporel WSOLA par blocs : durée et pic de mémoire par rapport à la taille du fichier."""
+    import tracemalloc
+    from time_stretch import time_stretch
+
+    input_file = write_test_wave(os.path.join(work_dir, "stretch_in.wav"), minutes * 60, channels=channels)
+    tracemalloc.start()
+    try:
+        seconds, _ = timed(time_stretch, input_file, os.path.join(work_dir, "stretch_out.wav"), ratio)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    print_result(
+        f"time-stretch x{ratio}", seconds,
+        f"({minutes:.0f} min, {channels} canaux, pic {peak / 1e6:.1f} Mo pour "
+        f"{os.path.getsize(input_file) / 1e6:.1f} Mo de WAV)"
+    )
+
+
+def bench_assemble(work_dir, lines=20, seconds_per_line=4.0):
+    """
+    Assemblage final : uniformisation pydub par ligne puis concaténation, contre l'assembleur
+    en une passe. Les lignes sont en mono 22,05 kHz pour forcer la conversion.
+    """
+    import io
+    import contextlib
+    from utility_functions import assemble_audio, concatenate_audio, convert_to_uniform_format
+
+    inputs = [
+        write_test_wave(os.path.join(work_dir, f"line_{i}.wav"), seconds_per_line, sample_rate=22050)
+        for i in range(lines)
+    ]
+
+    def two_passes():
+        uniform_files = []
+        for path in inputs:
+            uniform_file = path.replace(".wav", "_uniform.wav")
+            convert_to_uniform_format(path, uniform_file)
+            uniform_files.append(uniform_file)
+        concatenate_audio(os.path.join(work_dir, "assembled_old.wav"), uniform_files)
+        return uniform_files + [os.path.join(work_dir, "assembled_old.wav")]
+
+    def one_pass():
+        assemble_audio(os.path.join(work_dir, "assembled_new.wav"), inputs)
+        return [os.path.join(work_dir, "assembled_new.wav")]
+
+    for name, function in (("convert + concatenate", two_passes), ("assemble_audio", one_pass)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, written = timed(function)
+        written_bytes = sum(os.path.getsize(path) for path in written)
+        print_result(f"assemble {name}", seconds, f"({lines} lignes, {written_bytes / 1e6:.1f} Mo écrits)")
+
+
+def write_test_midi(file_path, tracks=16, notes_per_track=5000, ticks_per_beat=480):
+    """Écrit un fichier MIDI multipiste de test (notes de hauteurs et durées variées)."""
+    from mido import MidiFile, MidiTrack, Message
+
+    rng = np.random.default_rng(0)
+    midi = MidiFile(ticks_per_beat=ticks_per_beat)
+    for track_index in range(tracks):
+        track = MidiTrack()
+        for pitch, ticks in zip(rng.integers(36, 84, notes_per_track), rng.integers(60, 960, notes_per_track)):
+            channel = track_index % 16
+            track.append(Message("note_on", channel=channel, note=int(pitch), velocity=90, time=0))
+            track.append(Message("note_off", channel=channel, note=int(pitch), velocity=0, time=int(ticks)))
+        midi.tracks.append(track)
+    midi.save(file_path)
+    return file_path
+
+
+def bench_line_table(work_dir, lines=2000):
+    """
+    Chargement d'un projet dans le tableau de l'interface : ancien QTableWidget (un bouton et
+    deux QSpinBox par ligne) contre le modèle LineTableModel rempli en une seule opération.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication, QTableWidget, QTableWidgetItem, QTableView, QPushButton, QSpinBox
+    from line_table import LineTableModel
+
+    app = QApplication.instance() or QApplication([])
+    pairs = [(f"SOMH-Mesure{i}.mid", f"ligne de paroles {i}") for i in range(lines)]
+
+    def widgets():
+        table = QTableWidget(0, 5)
+        table.show()
+        for row, (midi_file, lyrics) in enumerate(pairs):
+            table.insertRow(row)
+            table.setCellWidget(row, 0, QPushButton("[...]"))
+            table.setItem(row, 1, QTableWidgetItem(midi_file))
+            table.setItem(row, 2, QTableWidgetItem(lyrics))
+            table.setCellWidget(row, 3, QSpinBox())
+            table.setCellWidget(row, 4, QSpinBox())
+        app.processEvents()
+        table.close()
+
+    def model():
+        table = QTableView()
+        line_model = LineTableModel(table)
+        table.setModel(line_model)
+        table.show()
+        line_model.load_lines(pairs)
+        app.processEvents()
+        table.close()
+
+    old_seconds, _ = timed(widgets)
+    new_seconds, _ = timed(model, repeat=3)
+    print_result("line-table QTableWidget + widgets", old_seconds, f"({lines} lignes)")
+    print_result("line-table modèle/vue", new_seconds, f"({lines} lignes)")
+
+
+def bench_midi_stage(work_dir, tracks=16, notes_per_track=5000, syllables=12):
+    """
+    Préparation du MIDI d'une ligne : trois lectures du fichier et deux fichiers intermédiaires
+    (ancien chemin) contre une table de notes lue une fois et une seule écriture.
+    """
+    import io
+    import contextlib
+    from note_table import read_note_table, vary_note_table, write_note_table
+    from utility_functions import (
+        adjust_midi_with_syllables, add_note_variation, create_midi_with_variations,
+        map_syllables_to_durations, add_stress_to_durations, match_durations_to_music,
+    )
+
+    midi_file = write_test_midi(os.path.join(work_dir, "large.mid"), tracks, notes_per_track)
+    durations = match_durations_to_music(add_stress_to_durations(map_syllables_to_durations(syllables), [0, 2]))
+    old_output = os.path.join(work_dir, "notes_old.mid")
+    new_output = os.path.join(work_dir, "notes_new.mid")
+
+    def old_path():
+        adjusted_midi_file = os.path.join(work_dir, "adjusted.mid")
+        adjust_midi_with_syllables(midi_file, ["x"] * syllables, adjusted_midi_file)
+        notes = add_note_variation(midi_file, durations)
+        create_midi_with_variations(adjusted_midi_file, notes, durations, old_output)
+
+    def new_path():
+        table = read_note_table(midi_file)
+        write_note_table(vary_note_table(table, durations), new_output)
+        return table
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        old_seconds, _ = timed(old_path)
+        new_seconds, table = timed(new_path)
+    with open(old_output, "rb") as old, open(new_output, "rb") as new:
+        identical = old.read() == new.read()
+    detail = f"({tracks} pistes, {len(table)} notes)"
+    print_result("midi-stage 3 lectures + 2 fichiers", old_seconds, detail)
+    print_result("midi-stage table de notes", new_seconds, f"{detail}, sortie identique : {identical}")
+
+
+def bench_rhythm(work_dir, lines=5000, max_syllables=24):
+    """
+    Planification du rythme de toutes les lignes : boucle Python par syllabe (ancien
+    match_durations_to_music, un appel par ligne) contre une passe NumPy sur tout le morceau.
+    """
+    from rhythm import plan_rhythm
+    from utility_functions import map_syllables_to_durations, add_stress_to_durations
+
+    music_temps = [6.0, 4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25, 0.125, 0.0625]
+    counts = np.random.default_rng(0).integers(1, max_syllables + 1, lines)
+
+    def per_line():
+        planned = []
+        for count in counts.tolist():
+            durations = add_stress_to_durations(map_syllables_to_durations(count), [0, 2])
+            adjusted = [min(music_temps, key=lambda x: (x >= duration, abs(x - duration))) for duration in durations]
+            total = sum(adjusted)
+            if total != 4:
+                adjusted[-1] += 4 - total
+            planned.append(adjusted)
+        return planned
+
+    old_seconds, old_plan = timed(per_line, repeat=3)
+    new_seconds, plan = timed(plan_rhythm, counts, repeat=3)
+    # Les lignes dont la dernière durée devenait négative sont désormais réduites proportionnellement
+    valid = [line for line, durations in enumerate(old_plan) if durations[-1] > 0]
+    identical = all(old_plan[line] == plan.line(line) for line in valid)
+    detail = f"({lines} lignes, {int(counts.sum())} syllabes)"
+    print_result("rhythm boucle par syllabe", old_seconds, detail)
+    print_result("rhythm passe vectorisée", new_seconds, f"{detail}, durées identiques : {identical}")
+
+
+def bench_syllables(work_dir, songs=200, lines_per_song=100, vocabulary=5000):
+    """
+    Analyse syllabique d'un grand corpus de paroles : syllapy.count mot par mot (ancien
+    analyze_verse) contre une analyse par lot avec cache des mots. Chaque morceau répète
+    son refrain, comme des paroles réelles.
+    """
+    import syllapy
+    from syllables import analyze_lyrics, count_syllables
+
+    rng = np.random.default_rng(0)
+    words = np.array(sorted(syllapy.WORD_DICT)[:vocabulary])
+    corpus = []
+    for _ in range(songs):
+        chorus = [" ".join(rng.choice(words, 8)) for _ in range(4)]
+        for index in range(lines_per_song):
+            corpus.append(chorus[index % 4] if index % 3 == 0 else " ".join(rng.choice(words, 8)))
+
+    def per_word():
+        return [[(word, syllapy.count(word)) for word in line.split()] for line in corpus]
+
+    def batch():
+        count_syllables.cache_clear()
+        return analyze_lyrics(corpus)
+
+    old_seconds, old_result = timed(per_word)
+    new_seconds, analysis = timed(batch)
+    identical = [sum(count for _, count in line) for line in old_result] == analysis.totals.tolist()
+    detail = f"({len(corpus)} lignes, {len(analysis.words)} mots)"
+    print_result("syllables syllapy mot par mot", old_seconds, detail)
+    print_result("syllables analyse par lot", new_seconds, f"{detail}, totaux identiques : {identical}")
+
+
+def bench_waveform(work_dir, minutes=10.0, channels=2, width=800, views=200):
+    """
+    Aperçu de la forme d'onde : lecture des échantillons à chaque zoom ou défilement contre
+    la pyramide de pics (calculée une fois par fichier).
+    """
+    import soundfile as sf
+    from peaks import compute_peaks
+
+    audio_file = write_test_wave(os.path.join(work_dir, "mix.wav"), minutes * 60, channels=channels)
+    frames = sf.info(audio_file).frames
+    rng = np.random.default_rng(0)
+    # Fenêtres de quelques secondes au morceau entier, comme en zoomant et en faisant défiler
+    lengths = np.exp(rng.uniform(np.log(44100), np.log(frames), views)).astype(np.int64)
+    starts = (rng.random(views) * (frames - lengths)).astype(np.int64)
+
+    def samples():
+        for start, length in zip(starts, lengths):
+            data = sf.read(audio_file, start=start, stop=start + length, dtype="int16", always_2d=True)[0]
+            edges = np.linspace(0, len(data), width + 1).astype(np.int64)[:-1]
+            np.minimum.reduceat(data.min(axis=1), edges), np.maximum.reduceat(data.max(axis=1), edges)
+
+    def pyramid_views(pyramid):
+        for start, length in zip(starts, lengths):
+            pyramid.window(start, start + length, width)
+
+    compute_seconds, pyramid = timed(compute_peaks, audio_file)
+    old_seconds, _ = timed(samples)
+    new_seconds, _ = timed(pyramid_views, pyramid, repeat=3)
+    print_result("waveform calcul des pics", compute_seconds, f"({minutes:.0f} min, {channels} canaux)")
+    print_result("waveform échantillons", old_seconds, f"({views} vues de {width} colonnes)")
+    print_result("waveform pyramide", new_seconds, f"({views} vues de {width} colonnes)")
+
+
+BENCHMARKS = {
+    "assemble": bench_assemble,
+    "import-time": bench_import_time,
+    "line-table": bench_line_table,
+    "midi-stage": bench_midi_stage,
+    "replicate-async": bench_replicate_async,
+    "rhythm": bench_rhythm,
+    "silence-trim": bench_silence_trim,
+    "syllables": bench_syllables,
+    "synth-overhead": bench_synth_overhead,
+    "time-stretch": bench_time_stretch,
+    "waveform": bench_waveform,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks du pipeline MIDI to Singing")
+    parser.add_argument("names", nargs="+", choices=sorted(BENCHMARKS) + ["all"])
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if "all" in args.names else args.names
+    with tempfile.TemporaryDirectory(prefix="midi_to_singing_bench_") as work_dir:
+        for name in names:
+            print(format_message(f"Benchmark : {name}", "ÉTAPE"))
+            BENCHMARKS[name](work_dir)
+
+
+if __name__ == "__main__":
+    main()
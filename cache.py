@@ -0,0 +1,243 @@
+# cache.py
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3  # 2 Go
+
+
+def default_cache_root():
+    """Dossier du cache par défaut (variable MIDI_TO_SINGING_CACHE_DIR ou ~/.cache/midi-to-singing)."""
+    return os.getenv("MIDI_TO_SINGING_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "midi-to-singing"
+    )
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Verrou exclusif inter-processus basé sur un fichier (flock, ou msvcrt sous Windows).
+    :param lock_path: Chemin du fichier de verrou (créé si nécessaire).
+    """
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """
+    Calcule l'empreinte SHA-256 du contenu d'un fichier.
+    :param file_path: Chemin du fichier.
+    :return: Empreinte hexadécimale.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """
+    Construit une clé de cache à partir de données binaires, de textes ou de paramètres.
+    Les dictionnaires sont sérialisés avec des clés triées pour que l'ordre n'importe pas.
+    :return: Clé hexadécimale.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            data = bytes(part)
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        # Préfixer par la longueur évite les collisions entre ("ab", "c") et ("a", "bc")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Cache persistant sur disque, adressé par contenu et partagé entre processus.
+    Les entrées sont rangées par espace de noms (ex. "rvc") mais partagent un même budget
+    en octets ; les moins récemment utilisées sont évincées lorsqu'il est dépassé.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_CACHE_SIZE):
+        """
+        :param root: Dossier du cache (par défaut : default_cache_root()).
+        :param max_bytes: Taille maximale totale des entrées, en octets.
+        """
+        self.root = root or default_cache_root()
+        self.max_bytes = max_bytes
+        self.session_stats = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_path(self, namespace, key):
+        """Chemin de l'entrée correspondant à une clé."""
+        return os.path.join(self.root, namespace, key[:2], key)
+
+    def _locked(self):
+        """Verrou exclusif inter-processus sur le cache."""
+        return file_lock(os.path.join(self.root, ".lock"))
+
+    def _record(self, namespace, outcome):
+        """Met à jour les statistiques de la session et les statistiques persistantes."""
+        stats = self.session_stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+        stats_file = os.path.join(self.root, "stats.json")
+        try:
+            with open(stats_file, "r", encoding="utf-8") as f:
+                totals = json.load(f)
+        except (OSError, ValueError):
+            totals = {}
+        ns_totals = totals.setdefault(namespace, {"hits": 0, "misses": 0})
+        ns_totals[outcome] = ns_totals.get(outcome, 0) + 1
+        self._write_atomic(stats_file, json.dumps(totals, indent=2).encode("utf-8"))
+
+    def _write_atomic(self, file_path, data):
+        """Écrit un fichier via un fichier temporaire renommé, pour ne jamais exposer d'écriture partielle."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, namespace, key, output_file):
+        """
+        Copie l'entrée correspondant à la clé vers output_file si elle existe.
+        :param namespace: Espace de noms de l'entrée.
+        :param key: Clé de l'entrée (voir make_key).
+        :param output_file: Fichier de destination.
+        :return: True en cas de succès (hit), False sinon (miss).
+        """
+        entry = self.entry_path(namespace, key)
+        with self._locked():
+            if not os.path.exists(entry):
+                self._record(namespace, "misses")
+                return False
+            shutil.copyfile(entry, output_file)
+            os.utime(entry)  # Marque l'entrée comme récemment utilisée (LRU)
+            self._record(namespace, "hits")
+        return True
+
+    def put(self, namespace, key, source_file):
+        """
+        Ajoute le fichier source au cache sous la clé donnée, puis applique l'éviction.
+        :param namespace: Espace de noms de l'entrée.
+        :param key: Clé de l'entrée (voir make_key).
+        :param source_file: Fichier à stocker.
+        """
+        entry = self.entry_path(namespace, key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        with open(source_file, "rb") as f:
+            data = f.read()
+        with self._locked():
+            self._write_atomic(entry, data)
+            self._evict()
+
+    def _entries(self):
+        """Liste les entrées du cache sous forme de tuples (mtime, taille, chemin)."""
+        entries = []
+        for namespace in os.listdir(self.root):
+            ns_dir = os.path.join(self.root, namespace)
+            if not os.path.isdir(ns_dir):
+                continue
+            for dirpath, _, filenames in os.walk(ns_dir):
+                for filename in filenames:
+                    if filename.endswith(".tmp"):
+                        continue
+                    entry = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(entry)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry))
+        return entries
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à respecter le budget."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def size(self):
+        """Taille totale actuelle des entrées, en octets."""
+        with self._locked():
+            return sum(size for _, size, _ in self._entries())
+
+    def stats(self):
+        """
+        Statistiques cumulées de tous les processus ayant utilisé le cache.
+        :return: Dictionnaire {namespace: {"hits": n, "misses": n}}.
+        """
+        with self._locked():
+            try:
+                with open(os.path.join(self.root, "stats.json"), "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+
+    def report(self, stats=None):
+        """
+        Formate les statistiques sous forme de lignes lisibles.
+        :param stats: Statistiques à formater (par défaut : celles de la session).
+        :return: Liste de chaînes, une par espace de noms.
+        """
+        stats = self.session_stats if stats is None else stats
+        lines = []
+        for namespace, counts in sorted(stats.items()):
+            total = counts["hits"] + counts["misses"]
+            rate = 100.0 * counts["hits"] / total if total else 0.0
+            lines.append(
+                f"Cache {namespace} : {counts['hits']} hits, {counts['misses']} misses ({rate:.0f} %)"
+            )
+        return lines
+
+
+def diff_stats(before, after):
+    """
+    Différence entre deux relevés de stats(), pour isoler l'activité d'une exécution
+    dont une partie s'est déroulée dans d'autres processus.
+    """
+    delta = {}
+    for namespace, counts in after.items():
+        previous = before.get(namespace, {})
+        delta[namespace] = {
+            outcome: counts.get(outcome, 0) - previous.get(outcome, 0)
+            for outcome in ("hits", "misses")
+        }
+    return delta
@@ -2,13 +2,21 @@
 import argparse
 import os
 from pipeline_runner import PipelineRunner
-from utility_functions import concatenate_audio, clean_all_temporary_files
+from cache import DiskCache, diff_stats
+from model_store import ModelStore
+from scheduler import PipelineScheduler
+from rvc_backends import get_backend
+from synth_pool import SynthesisPool
+from utility_functions import concatenate_audio
+from wav_assembler import WavAssembler
+from song_map import SongMidi
 
-def validate_inputs(midi_files, lyrics_file):
+def validate_inputs(midi_files, lyrics_file, song_segments=None):
     """
     Valide que le nombre de fichiers MIDI correspond au nombre de lignes dans le fichier de paroles.
     :param midi_files: Liste des fichiers MIDI.
     :param lyrics_file: Fichier contenant les paroles.
+    :param song_segments: Nombre de segments disponibles dans le MIDI du morceau (mode --song-midi).
     :raises: ValueError si la validation échoue.
     """
     if not os.path.exists(lyrics_file):
@@ -17,12 +25,40 @@ def validate_inputs(midi_files, lyrics_file):
     with open(lyrics_file, "r", encoding="utf-8") as f:
         lyrics_lines = f.readlines()
 
+    if song_segments is not None:
+        if song_segments < len(lyrics_lines):
+            raise ValueError(
+                f"Le MIDI du morceau ne contient que {song_segments} segments pour "
+                f"{len(lyrics_lines)} lignes de paroles."
+            )
+        return
+
+    if not midi_files:
+        raise ValueError("Aucun fichier MIDI fourni (-m ou --song-midi).")
+
     if len(midi_files) != len(lyrics_lines):
         raise ValueError(
             f"Le nombre de fichiers MIDI ({len(midi_files)}) doit correspondre "
             f"au nombre de lignes dans le fichier de paroles ({len(lyrics_lines)})."
         )
 
+def validate_modes(args):
+    """
+    Vérifie que les modes d'exécution demandés sont compatibles entre eux.
+    :param args: Arguments passés depuis main.py.
+    :raises: ValueError si deux options s'excluent.
+    """
+    if args.batch_rvc and args.pipelined:
+        raise ValueError(
+            "--batch-rvc et --pipelined sont incompatibles : la prédiction unique attend toutes les lignes, "
+            "alors que --pipelined transforme chaque ligne dès qu'elle est prête."
+        )
+    if args.batch_rvc and args.remote_concurrency:
+        raise ValueError(
+            "--batch-rvc et --remote-concurrency sont incompatibles : --batch-rvc n'envoie qu'une prédiction "
+            "par hauteur distincte."
+        )
+
 def run_cli(args):
     """
     Exécute le pipeline en mode terminal.
@@ -32,51 +68,107 @@ def run_cli(args):
     logger = print
 
     # Valider les entrées
+    song = None
+    song_segments = None
     try:
-        validate_inputs(args.midi_files, args.lyrics_file)
-    except ValueError as e:
+        validate_modes(args)
+        if args.song_midi:
+            # Un seul fichier lu pour tout le morceau ; les lignes sont découpées par mesures
+            song = SongMidi(args.song_midi)
+            song_segments = song.segments(args.measures_per_line, args.first_measure)
+            logger(f"MIDI du morceau : {len(song.measures)} mesures, {len(song_segments)} segments.")
+        validate_inputs(args.midi_files, args.lyrics_file, len(song_segments) if song else None)
+    except (ValueError, OSError) as e:
         logger(f"Erreur de validation des entrées : {e}")
         exit(1)
 
+    try:
+        rvc_backend = get_backend(args.rvc_backend)
+    except ValueError as e:
+        logger(f"Erreur : {e}")
+        exit(1)
+
     # Vérifier la clé Replicate
     replicate_token = args.replicate_token or os.getenv("REPLICATE_API_TOKEN")
-    if not replicate_token:
-        logger("Erreur : Aucune clé REPLICATE_API_TOKEN fournie ou exportée dans l'environnement.")
-        exit(1)
+    if rvc_backend.name == "replicate":
+        if not replicate_token:
+            logger("Erreur : Aucune clé REPLICATE_API_TOKEN fournie ou exportée dans l'environnement.")
+            exit(1)
+        os.environ["REPLICATE_API_TOKEN"] = replicate_token
 
     # Vérifier le modèle RVC personnalisé si sélectionné
-    if args.rvc_voice == "CUSTOM" and not args.custom_rvc_url:
+    if rvc_backend.requires_model and args.rvc_voice == "CUSTOM" and not args.custom_rvc_url:
         logger("Erreur : Le modèle RVC personnalisé est requis lorsque 'CUSTOM' est sélectionné.")
         exit(1)
 
     # Exécuter le pipeline
-    runner = PipelineRunner(logger)
+    cache = None
+    if not args.no_cache:
+        cache = DiskCache(args.cache_dir, max_bytes=int(args.cache_size * 1024 ** 2))
+        cache_stats_before = cache.stats()
+
+    synth_pool = None
+    if args.synth_workers:
+        logger(f"Démarrage de {args.synth_workers} processus de synthèse...")
+        synth_pool = SynthesisPool(workers=args.synth_workers, max_jobs=args.synth_max_jobs)
+
+    model_store = ModelStore(os.path.join(args.cache_dir, "models") if args.cache_dir else None, logger)
+    runner = PipelineRunner(
+        logger, scratch_root=args.scratch_dir, use_tmpfs=args.tmpfs, cache=cache,
+        model_store=model_store, rvc_model_sha256=args.rvc_model_sha256, rvc_backend=rvc_backend,
+        synth_mode=args.synth_mode, synth_pool=synth_pool,
+    )
     try:
-        all_wave_files = []
         with open(args.lyrics_file, "r", encoding="utf-8") as f:
             lyrics_lines = [line.strip() for line in f.readlines()]
 
-        for midi_file, lyrics in zip(args.midi_files, lyrics_lines):
-            final_wave = runner.run_pipeline(
-                midi_file=midi_file,
-                lyrics=lyrics,
-                duration=args.target_duration,
-                pitch=0,  # Pitch par défaut
-                custom_rvc_model_url=args.custom_rvc_url if args.rvc_voice == "CUSTOM" else None
+        if song:
+            lines = [
+                (
+                    song.line(first, count), lyrics,
+                    song.duration(first, count) if args.midi_durations else args.target_duration, 0
+                )
+                for (first, count), lyrics in zip(song_segments, lyrics_lines)
+            ]
+        else:
+            lines = [
+                (midi_file, lyrics, args.target_duration, 0)  # Pitch par défaut
+                for midi_file, lyrics in zip(args.midi_files, lyrics_lines)
+            ]
+        custom_rvc_model_url = args.custom_rvc_url if args.rvc_voice == "CUSTOM" else None
+        if args.pipelined:
+            # Chaque ligne est écrite à sa place dans le fichier final dès qu'elle est finalisée
+            with WavAssembler(args.output_file, [duration for _, _, duration, _ in lines]) as assembler:
+                scheduler = PipelineScheduler(
+                    runner, jobs=args.jobs, remote_concurrency=args.remote_concurrency or 4, assembler=assembler
+                )
+                scheduler.run(lines, custom_rvc_model_url)
+        else:
+            all_wave_files = runner.run_lines(
+                lines,
+                custom_rvc_model_url=custom_rvc_model_url,
+                jobs=args.jobs,
+                remote_concurrency=args.remote_concurrency,
+                batch_rvc=args.batch_rvc,
             )
-            all_wave_files.append(final_wave)
 
-        # Concaténer les fichiers WAV
-        concatenate_audio(args.output_file, all_wave_files)
-        
-        # Nettoyage des fichiers temporaires
-        clean_all_temporary_files(len(all_wave_files))
+            # Concaténer les fichiers WAV
+            concatenate_audio(args.output_file, all_wave_files)
+
+        if cache:
+            for line in cache.report(diff_stats(cache_stats_before, cache.stats())):
+                logger(line)
         
         logger(f"Pipeline terminé avec succès. Fichier final : {args.output_file}")
 
     except Exception as e:
         logger(f"Erreur lors de l'exécution du pipeline : {e}")
         exit(1)
+    finally:
+        # Nettoyage des dossiers de travail, que le pipeline ait réussi ou non
+        runner.clean_scratch()
+        if synth_pool:
+            synth_pool.close()
 
 if __name__ == "__main__":
     run_cli()
@@ -0,0 +1,154 @@
+# fake_replicate_server.py
+import json
+import time
+import base64
+import argparse
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakePredictionsServer:
+    """
+    Serveur HTTP local qui imite l'API des prédictions Replicate.
+    Chaque prédiction « réussit » après latency secondes et renvoie l'audio d'entrée tel quel
+    (ou échoue si fail_if le demande), ce qui permet de tester et mesurer le pipeline sans réseau ni GPU.
+    Utilisation : REPLICATE_API_BASE_URL=http://127.0.0.1:<port> python main.py --cli ...
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=2.0, fail_if=None, fail_latency=None):
+        """
+        :param host: Adresse d'écoute.
+        :param port: Port d'écoute (0 = port libre choisi par le système).
+        :param latency: Durée simulée d'une prédiction (en secondes).
+        :param fail_if: Fonction recevant les entrées d'une prédiction et renvoyant True si elle doit échouer.
+        :param fail_latency: Délai avant l'échec d'une telle prédiction (par défaut : latency).
+        """
+        self.latency = latency
+        self.fail_if = fail_if
+        self.fail_latency = latency if fail_latency is None else fail_latency
+        self.canceled = set()  # Prédictions annulées par le client
+        self.predictions = {}
+        self.files = {}
+        self.polls = {}  # Nombre d'interrogations (GET) de chaque prédiction
+        self.max_in_flight = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def _in_flight(self):
+        now = time.monotonic()
+        return sum(1 for p in self.predictions.values() if now < p["ready_at"] and not p["canceled"])
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _prediction(self, prediction_id):
+                prediction = server.predictions[prediction_id]
+                done = time.monotonic() >= prediction["ready_at"]
+                failed = done and prediction["fail"]
+                if prediction["canceled"]:
+                    status = "canceled"
+                elif not done:
+                    status = "processing"
+                else:
+                    status = "failed" if failed else "succeeded"
+                return {
+                    "id": prediction_id,
+                    "status": status,
+                    "output": f"{server.base_url}/files/{prediction_id}.wav" if status == "succeeded" else None,
+                    "error": "Échec simulé" if failed else None,
+                    "urls": {
+                        "get": f"{server.base_url}/predictions/{prediction_id}",
+                        "cancel": f"{server.base_url}/predictions/{prediction_id}/cancel",
+                    },
+                }
+
+            def do_POST(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 3 and parts[0] == "predictions" and parts[2] == "cancel" \
+                        and parts[1] in server.predictions:
+                    with server._lock:
+                        prediction = server.predictions[parts[1]]
+                        if time.monotonic() < prediction["ready_at"]:
+                            prediction["canceled"] = True
+                            server.canceled.add(parts[1])
+                    self._send_json(self._prediction(parts[1]))
+                    return
+                if self.path.rstrip("/") != "/predictions":
+                    self._send_json({"detail": "Not found"}, 404)
+                    return
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                audio = payload["input"].get("input_audio", "")
+                data = base64.b64decode(audio.split(",", 1)[1]) if audio.startswith("data:") else b""
+                with server._lock:
+                    prediction_id = str(next(server._ids))
+                    fail = bool(server.fail_if and server.fail_if(payload["input"]))
+                    server.predictions[prediction_id] = {
+                        "ready_at": time.monotonic() + (server.fail_latency if fail else server.latency),
+                        "fail": fail,
+                        "canceled": False,
+                    }
+                    server.files[prediction_id] = data
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight())
+                self._send_json(self._prediction(prediction_id), 201)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 2 and parts[0] == "predictions" and parts[1] in server.predictions:
+                    with server._lock:
+                        server.polls[parts[1]] = server.polls.get(parts[1], 0) + 1
+                    self._send_json(self._prediction(parts[1]))
+                elif len(parts) == 2 and parts[0] == "files" and parts[1][:-4] in server.files:
+                    data = server.files[parts[1][:-4]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "audio/wav")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json({"detail": "Not found"}, 404)
+
+        return Handler
+
+    def start(self):
+        """Démarre le serveur dans un thread d'arrière-plan."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le serveur."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API des prédictions Replicate")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=2.0, help="Durée simulée d'une prédiction (en secondes)")
+    args = parser.parse_args()
+    server = FakePredictionsServer(port=args.port, latency=args.latency)
+    print(f"Serveur de prédictions factice : {server.base_url}")
+    server.httpd.serve_forever()
@@ -0,0 +1,207 @@
+# line_table.py
+import os
+import re
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtWidgets import (
+    QStyledItemDelegate, QSpinBox, QWidget, QHBoxLayout, QLineEdit, QToolButton, QFileDialog
+)
+
+# Colonnes du tableau
+MIDI_COLUMN, LYRICS_COLUMN, DURATION_COLUMN, PITCH_COLUMN, STATUS_COLUMN, TIME_COLUMN = range(6)
+HEADERS = ["Fichier MIDI", "Ligne de paroles", "Durée", "Pitch", "Statut", "Temps"]
+
+DEFAULT_DURATION = 3  # secondes
+DEFAULT_PITCH = 0  # demi-tons
+
+
+def natural_sort_key(text):
+    """Clé de tri « naturel » : SOMH-Mesure2.mid avant SOMH-Mesure10.mid."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", text)]
+
+
+def pair_midi_folder(midi_folder, lyrics_file):
+    """
+    Associe les fichiers MIDI d'un dossier (triés par nom, en ordre naturel) aux lignes non vides
+    d'un fichier de paroles, dans l'ordre.
+
+    :param midi_folder: Dossier contenant les fichiers MIDI (*.mid, *.midi).
+    :param lyrics_file: Fichier de paroles, une ligne par fichier MIDI.
+    :return: Tuple (liste des tuples (midi_file, lyrics), nombre de fichiers MIDI, nombre de lignes).
+             Les éléments en surnombre d'un côté ou de l'autre sont ignorés.
+    """
+    midi_files = sorted(
+        (name for name in os.listdir(midi_folder) if name.lower().endswith((".mid", ".midi"))),
+        key=natural_sort_key,
+    )
+    with open(lyrics_file, "r", encoding="utf-8") as f:
+        lyrics_lines = [line.strip() for line in f if line.strip()]
+    pairs = [(os.path.join(midi_folder, name), lyrics) for name, lyrics in zip(midi_files, lyrics_lines)]
+    return pairs, len(midi_files), len(lyrics_lines)
+
+
+class LineTableModel(QAbstractTableModel):
+    """
+    Modèle des associations MIDI/paroles : une liste Python par ligne, sans widget par cellule.
+    La vue ne crée des éditeurs (délégués) que pour la cellule en cours d'édition, ce qui permet
+    d'afficher des milliers de lignes. Une ligne vide est toujours présente en fin de tableau.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = [self._empty_row()]
+
+    @staticmethod
+    def _empty_row():
+        return ["", "", DEFAULT_DURATION, DEFAULT_PITCH, "", ""]
+
+    @staticmethod
+    def _is_filled(row):
+        """Une ligne est utilisable si son fichier MIDI et ses paroles sont renseignés."""
+        return bool(row[MIDI_COLUMN].strip() and row[LYRICS_COLUMN].strip())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() in (DURATION_COLUMN, PITCH_COLUMN, TIME_COLUMN):
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (STATUS_COLUMN, TIME_COLUMN):
+            return flags
+        return flags | Qt.ItemFlag.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row, column = index.row(), index.column()
+        if column in (DURATION_COLUMN, PITCH_COLUMN):
+            value = int(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        self.rows[row][column] = value
+        self.dataChanged.emit(index, index, [role])
+
+        # Ajouter une ligne vide dès que la dernière ligne est remplie
+        if row == len(self.rows) - 1 and self._is_filled(self.rows[row]):
+            self.append_row()
+        return True
+
+    def append_row(self):
+        """Ajoute une ligne vide en fin de tableau."""
+        position = len(self.rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.append(self._empty_row())
+        self.endInsertRows()
+
+    def load_lines(self, lines):
+        """
+        Remplace toutes les lignes du tableau en une seule opération (une seule notification à la vue).
+        :param lines: Liste de tuples (midi_file, lyrics) ou (midi_file, lyrics, duration, pitch).
+        """
+        self.beginResetModel()
+        self.rows = [
+            [line[0], line[1], *(line[2:4] if len(line) >= 4 else (DEFAULT_DURATION, DEFAULT_PITCH)), "", ""]
+            for line in lines
+        ]
+        self.rows.append(self._empty_row())
+        self.endResetModel()
+
+    def pipeline_lines(self):
+        """
+        Lignes utilisables pour le pipeline.
+        :return: Tuple (liste des tuples (midi_file, lyrics, duration, pitch), ligne du tableau de chacune).
+        """
+        lines, row_numbers = [], []
+        for number, row in enumerate(self.rows):
+            if self._is_filled(row):
+                lines.append((row[MIDI_COLUMN], row[LYRICS_COLUMN], row[DURATION_COLUMN], row[PITCH_COLUMN]))
+                row_numbers.append(number)
+        return lines, row_numbers
+
+    def status(self, row):
+        """Statut affiché pour une ligne."""
+        return self.rows[row][STATUS_COLUMN]
+
+    def set_status(self, row, status, timing):
+        """Met à jour le statut et le temps de traitement d'une ligne."""
+        self.rows[row][STATUS_COLUMN] = status
+        self.rows[row][TIME_COLUMN] = timing
+        self.dataChanged.emit(self.index(row, STATUS_COLUMN), self.index(row, TIME_COLUMN))
+
+    def set_statuses(self, rows, status):
+        """Met à jour le statut de plusieurs lignes (et efface leur temps) en une seule notification."""
+        if not rows:
+            return
+        for row in rows:
+            self.rows[row][STATUS_COLUMN] = status
+            self.rows[row][TIME_COLUMN] = ""
+        self.dataChanged.emit(self.index(min(rows), STATUS_COLUMN), self.index(max(rows), TIME_COLUMN))
+
+
+class SpinBoxDelegate(QStyledItemDelegate):
+    """Éditeur QSpinBox créé seulement pendant l'édition d'une cellule entière."""
+
+    def __init__(self, minimum, maximum, parent=None):
+        super().__init__(parent)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def createEditor(self, parent, option, index):
+        spinbox = QSpinBox(parent)
+        spinbox.setRange(self.minimum, self.maximum)
+        spinbox.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        return spinbox
+
+    def setEditorData(self, editor, index):
+        editor.setValue(int(index.data(Qt.ItemDataRole.EditRole)))
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.ItemDataRole.EditRole)
+
+
+class MidiFileDelegate(QStyledItemDelegate):
+    """Éditeur du chemin MIDI : champ texte et bouton [...] ouvrant une boîte de dialogue."""
+
+    def createEditor(self, parent, option, index):
+        editor = QWidget(parent)
+        layout = QHBoxLayout(editor)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        editor.line_edit = QLineEdit(editor)
+        browse_button = QToolButton(editor)
+        browse_button.setText("[...]")
+        browse_button.clicked.connect(lambda: self.browse(editor))
+        layout.addWidget(editor.line_edit)
+        layout.addWidget(browse_button)
+        editor.setFocusProxy(editor.line_edit)
+        return editor
+
+    def browse(self, editor):
+        selected_file, _ = QFileDialog.getOpenFileName(
+            editor, "Fichier MIDI", editor.line_edit.text(), "Fichiers MIDI (*.mid *.midi);;Tous les fichiers (*)"
+        )
+        if selected_file:
+            editor.line_edit.setText(selected_file)
+            self.commitData.emit(editor)
+
+    def setEditorData(self, editor, index):
+        editor.line_edit.setText(index.data(Qt.ItemDataRole.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.line_edit.text(), Qt.ItemDataRole.EditRole)
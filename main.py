@@ -1,17 +1,27 @@
 # main.py
 import sys
 import argparse
-from PyQt6.QtWidgets import QApplication
-from main_window import MainWindow
-from pipeline_runner import PipelineRunner
-from utility_functions import console_logger
-from cli import run_cli
+from rvc_backends import BACKENDS
+
+# Les modules du pipeline et de l'interface graphique sont importés seulement par le mode
+# qui les utilise : --help ou un rendu en CLI ne chargent jamais PyQt6.
 
 def run_gui():
     """Lance l'interface graphique."""
+    from PyQt6.QtWidgets import QApplication
+    from main_window import MainWindow
+    from pipeline_runner import PipelineRunner
+    from utility_functions import console_logger
+    from cache import DiskCache
+    from model_store import ModelStore
+    from rvc_backends import get_backend
+
     app = QApplication(sys.argv)
     logger = console_logger
-    main_window = MainWindow(logger, PipelineRunner(logger))
+    runner = PipelineRunner(
+        logger, cache=DiskCache(), model_store=ModelStore(logger=logger), rvc_backend=get_backend()
+    )
+    main_window = MainWindow(logger, runner)
     main_window.show()
     sys.exit(app.exec())
 
@@ -40,12 +50,30 @@ def main():
     parser.add_argument('--cli', action='store_true', help="Lancer le pipeline en mode terminal")
     # Arguments supplémentaires pour le CLI
     parser.add_argument('-m', '--midi-files', nargs='+', help="Liste des fichiers MIDI")
+    parser.add_argument('--song-midi', help="Fichier MIDI du morceau complet, découpé en lignes par mesures (remplace -m)")
+    parser.add_argument('--measures-per-line', type=int, default=1, help="Nombre de mesures par ligne de paroles (avec --song-midi)")
+    parser.add_argument('--first-measure', type=int, default=0, help="Index de la mesure de la première ligne (avec --song-midi)")
+    parser.add_argument('--midi-durations', action='store_true', help="Utiliser la durée réelle de chaque segment (carte des tempos) comme durée cible (avec --song-midi)")
     parser.add_argument('-l', '--lyrics-file', help="Fichier contenant les paroles")
     parser.add_argument('-o', '--output-file', default="voice_sounds.wav", help="Fichier de sortie audio final")
     parser.add_argument('-t', '--target-duration', type=float, default=3.0, help="Durée cible par ligne (en secondes)")
     parser.add_argument('-k', '--replicate-token', help="Clé API Replicate")
     parser.add_argument('-v', '--rvc-voice', choices=["CUSTOM", "Obama", "Trump", "Sandy", "Rogan"], default="CUSTOM", help="Voix RVC à utiliser")
     parser.add_argument('-c', '--custom-rvc-url', help="URL ou chemin du modèle RVC (si 'CUSTOM' est choisi)")
+    parser.add_argument('--rvc-backend', choices=sorted(BACKENDS), help="Backend de conversion de voix (par défaut : replicate, ou MIDI_TO_SINGING_RVC_BACKEND)")
+    parser.add_argument('--rvc-model-sha256', help="Empreinte SHA-256 attendue du modèle RVC (vérifiée après téléchargement)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="Nombre de lignes traitées en parallèle")
+    parser.add_argument('--remote-concurrency', type=int, help="Soumettre les transformations RVC de toutes les lignes en parallèle (nombre maximal de prédictions simultanées)")
+    parser.add_argument('--pipelined', action='store_true', help="Chevaucher la synthèse locale et la transformation RVC distante des lignes")
+    parser.add_argument('--batch-rvc', action='store_true', help="Envoyer une seule prédiction RVC pour l'ensemble du morceau")
+    parser.add_argument('--synth-mode', choices=["inprocess", "subprocess"], default="inprocess", help="Appeler midi2voice dans le processus courant ou via un sous-processus par ligne")
+    parser.add_argument('--synth-workers', type=int, default=0, help="Nombre de processus de synthèse persistants (0 = pas de pool)")
+    parser.add_argument('--synth-max-jobs', type=int, default=50, help="Nombre de synthèses après lequel un processus du pool est recyclé")
+    parser.add_argument('--scratch-dir', help="Dossier parent des dossiers de travail temporaires")
+    parser.add_argument('--tmpfs', action='store_true', help="Placer les dossiers de travail sur tmpfs (/dev/shm)")
+    parser.add_argument('--cache-dir', help="Dossier du cache des rendus (par défaut : ~/.cache/midi-to-singing)")
+    parser.add_argument('--cache-size', type=float, default=2048, help="Taille maximale du cache (en Mo)")
+    parser.add_argument('--no-cache', action='store_true', help="Désactiver le cache des rendus")
     args = parser.parse_args()
 
     # Gestion des arguments
@@ -55,6 +83,7 @@ def main():
         run_gui()
     elif args.cli:
         # Passer les arguments au CLI
+        from cli import run_cli
         run_cli(args)
     else:
         # Si aucun argument n'est fourni, afficher l'aide par défaut
@@ -1,18 +1,31 @@
 # main_window.py
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
-    QSpinBox, QFileDialog
+    QLabel, QLineEdit, QTableView, QHeaderView, QComboBox,
+    QSpinBox, QFileDialog, QProgressBar
+)
+from PyQt6.QtCore import Qt, QThreadPool
+from utility_functions import format_message
+from pipeline_worker import PipelineWorker
+from waveform_view import WaveformView
+from line_table import (
+    LineTableModel, SpinBoxDelegate, MidiFileDelegate, pair_midi_folder,
+    MIDI_COLUMN, LYRICS_COLUMN, DURATION_COLUMN, PITCH_COLUMN, STATUS_COLUMN, TIME_COLUMN,
 )
-from PyQt6.QtCore import Qt
-from utility_functions import clean_all_temporary_files, format_message, concatenate_audio, convert_to_uniform_format
 import os
 
+# Libellés des étapes signalées par l'ordonnanceur
+STAGE_LABELS = {"local": "Synthèse", "distant": "RVC", "final": "Ajustement"}
+
 class MainWindow(QMainWindow):
     def __init__(self, logger=None, pipeline_runner=None):
         super().__init__()
         self.logger = logger
         self.pipeline_runner = pipeline_runner
+        self.worker = None
+        self.line_rows = []  # Ligne du tableau de chaque ligne traitée
+        self.line_times = {}  # Durée cumulée des étapes terminées, par ligne
+        self.line_slots = []  # Position de chaque ligne traitée dans le fichier final
         self.setWindowTitle("Pipeline Audio - UI")
         self.resize(800, 600)
 
@@ -23,6 +36,7 @@ class MainWindow(QMainWindow):
         self.setup_global_params()
         self.setup_table()
         self.setup_buttons()
+        self.setup_waveform()
 
         # Configurer le widget central
         central_widget = QWidget()
@@ -70,6 +84,13 @@ class MainWindow(QMainWindow):
         params_layout.addWidget(QLabel("Fichier de sortie audio :"))
         params_layout.addWidget(self.output_file_input)
 
+        # Nombre de lignes préparées en parallèle
+        jobs_layout = QHBoxLayout()
+        self.jobs_spinbox = self.create_spinbox(min(4, os.cpu_count() or 1), 1, os.cpu_count() or 1)
+        jobs_layout.addWidget(QLabel("Lignes traitées en parallèle :"))
+        jobs_layout.addWidget(self.jobs_spinbox)
+        params_layout.addLayout(jobs_layout)
+
         self.layout.addLayout(params_layout)
 
     def browse_rvc_model(self):
@@ -85,20 +106,27 @@ class MainWindow(QMainWindow):
         self.custom_rvc_url_input.setVisible(voice == "CUSTOM")
 
     def setup_table(self):
-        """Tableau pour associer fichiers MIDI et lignes de paroles."""
-        self.table = QTableWidget(0, 5)  # 5 colonnes : Action, Fichier MIDI, Paroles, Durée, Pitch
-        self.table.setHorizontalHeaderLabels(["Action", "Fichier MIDI", "Ligne de paroles", "Durée", "Pitch"])
+        """Tableau (modèle/vue) pour associer fichiers MIDI et lignes de paroles."""
+        self.line_model = LineTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.line_model)
 
-        header = self.table.horizontalHeader()
-        self.table.setColumnWidth(0, 80)  # Colonne "Action" : taille fixe
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)  # Colonne "Fichier MIDI"
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)  # Colonne "Paroles"
-        self.table.setColumnWidth(3, 60)  # Colonne "Durée" : taille fixe
-        self.table.setColumnWidth(4, 60)  # Colonne "Pitch" : taille fixe
+        # Éditeurs créés seulement pendant l'édition d'une cellule (aucun widget par ligne)
+        self.table.setItemDelegateForColumn(MIDI_COLUMN, MidiFileDelegate(self.table))
+        self.table.setItemDelegateForColumn(DURATION_COLUMN, SpinBoxDelegate(1, 10, self.table))
+        self.table.setItemDelegateForColumn(PITCH_COLUMN, SpinBoxDelegate(-12, 12, self.table))
 
-        self.table.cellChanged.connect(self.check_last_row)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(MIDI_COLUMN, QHeaderView.ResizeMode.Stretch)  # Colonne "Fichier MIDI"
+        header.setSectionResizeMode(LYRICS_COLUMN, QHeaderView.ResizeMode.Stretch)  # Colonne "Paroles"
+        self.table.setColumnWidth(DURATION_COLUMN, 60)  # Colonne "Durée" : taille fixe
+        self.table.setColumnWidth(PITCH_COLUMN, 60)  # Colonne "Pitch" : taille fixe
+        self.table.setColumnWidth(STATUS_COLUMN, 140)  # Colonne "Statut" : taille fixe
+        self.table.setColumnWidth(TIME_COLUMN, 70)  # Colonne "Temps" : taille fixe
+
+        # Hauteur de ligne fixe : la vue n'a pas à mesurer chaque ligne
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.layout.addWidget(self.table)
-        self.add_table_row()  # Ajouter une ligne initiale
 
     def create_spinbox(self, default_value, min_value, max_value):
         """Crée un QSpinBox configuré."""
@@ -111,55 +139,37 @@ class MainWindow(QMainWindow):
 
     def add_table_row(self):
         """Ajoute une ligne au tableau pour une nouvelle association MIDI/paroles."""
-        row_count = self.table.rowCount()
-        self.table.insertRow(row_count)
-
-        # Colonne Action : Bouton pour parcourir les fichiers MIDI
-        browse_button = QPushButton("[...]")
-        browse_button.clicked.connect(lambda _, row=row_count: self.browse_file(row))
-        self.table.setCellWidget(row_count, 0, browse_button)
-
-        # Colonne Fichier MIDI
-        self.table.setItem(row_count, 1, QTableWidgetItem(""))
-
-        # Colonne Paroles
-        self.table.setItem(row_count, 2, QTableWidgetItem(""))
-
-        # Colonne Durée : SpinBox
-        duration_spinbox = QSpinBox()
-        duration_spinbox.setMinimum(1)
-        duration_spinbox.setMaximum(10)
-        duration_spinbox.setValue(3)  # Par défaut : 3 secondes
-        self.table.setCellWidget(row_count, 3, duration_spinbox)
-
-        # Colonne Pitch : SpinBox
-        pitch_spinbox = QSpinBox()
-        pitch_spinbox.setMinimum(-12)
-        pitch_spinbox.setMaximum(12)
-        pitch_spinbox.setValue(0)  # Par défaut : 0 demi-ton
-        self.table.setCellWidget(row_count, 4, pitch_spinbox)
-
-    def browse_file(self, row):
-        """Ouvre une boîte de dialogue pour sélectionner un fichier MIDI."""
-        file_dialog = QFileDialog()
-        file_dialog.setNameFilters(["Fichiers MIDI (*.mid *.midi)", "Tous les fichiers (*)"])
-        if file_dialog.exec():
-            selected_file = file_dialog.selectedFiles()[0]
-            self.table.setItem(row, 1, QTableWidgetItem(selected_file))  # Colonne Fichier MIDI
+        self.line_model.append_row()
 
-    def check_last_row(self):
-        """Vérifie si la dernière ligne est remplie et ajoute une nouvelle ligne si nécessaire."""
-        row_count = self.table.rowCount()
-        if row_count == 0:
+    def import_lines(self):
+        """
+        Import groupé : associe les fichiers MIDI d'un dossier (ordre naturel des noms) aux lignes
+        d'un fichier de paroles, et remplace le contenu du tableau en une seule opération.
+        """
+        midi_folder = QFileDialog.getExistingDirectory(self, "Dossier des fichiers MIDI")
+        if not midi_folder:
             return
-
-        last_row_filled = all(
-            self.table.item(row_count - 1, col) and self.table.item(row_count - 1, col).text().strip()
-            for col in range(1, 3)  # Vérifie les colonnes "Fichier MIDI" et "Ligne de paroles"
+        lyrics_file, _ = QFileDialog.getOpenFileName(
+            self, "Fichier de paroles", midi_folder, "Fichiers texte (*.txt);;Tous les fichiers (*)"
         )
+        if not lyrics_file:
+            return
+        self.load_lines(midi_folder, lyrics_file)
 
-        if last_row_filled:
-            self.add_table_row()
+    def load_lines(self, midi_folder, lyrics_file):
+        """Remplit le tableau avec les associations d'un dossier MIDI et d'un fichier de paroles."""
+        try:
+            pairs, midi_count, lyrics_count = pair_midi_folder(midi_folder, lyrics_file)
+        except OSError as e:
+            self.log(f"Import impossible : {e}", "ERREUR")
+            return
+        if midi_count != lyrics_count:
+            self.log(
+                f"{midi_count} fichiers MIDI pour {lyrics_count} lignes de paroles : "
+                f"seules les {len(pairs)} premières associations sont importées.", "ERREUR"
+            )
+        self.line_model.load_lines(pairs)
+        self.log(f"{len(pairs)} lignes importées depuis {midi_folder}.", "RÉUSSI")
 
     def setup_buttons(self):
         """Boutons pour lancer le pipeline."""
@@ -169,12 +179,53 @@ class MainWindow(QMainWindow):
         self.add_row_button.clicked.connect(self.add_table_row)
         buttons_layout.addWidget(self.add_row_button)
 
+        self.import_button = QPushButton("Importer un dossier MIDI...")
+        self.import_button.clicked.connect(self.import_lines)
+        buttons_layout.addWidget(self.import_button)
+
         self.run_pipeline_button = QPushButton("Lancer le pipeline")
         self.run_pipeline_button.clicked.connect(self.run_pipeline)
         buttons_layout.addWidget(self.run_pipeline_button)
 
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_pipeline)
+        buttons_layout.addWidget(self.cancel_button)
+
         self.layout.addLayout(buttons_layout)
 
+        # Avancement global : nombre de lignes terminées
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.layout.addWidget(self.progress_bar)
+
+    def setup_waveform(self):
+        """Aperçu de la forme d'onde du fichier final, ou de la ligne sélectionnée dans le tableau."""
+        waveform_layout = QHBoxLayout()
+        self.waveform_view = WaveformView()
+        waveform_layout.addWidget(self.waveform_view, 1)
+
+        self.show_mix_button = QPushButton("Afficher le mix")
+        self.show_mix_button.setEnabled(False)
+        self.show_mix_button.clicked.connect(self.show_mix)
+        waveform_layout.addWidget(self.show_mix_button)
+        self.layout.addLayout(waveform_layout)
+
+        self.table.selectionModel().currentRowChanged.connect(self.show_line_waveform)
+
+    def show_mix(self):
+        """Affiche le fichier final en entier."""
+        self.waveform_view.set_range(0, self.waveform_view.pyramid.frames if self.waveform_view.pyramid else 0)
+
+    def show_line_waveform(self, current, previous=None):
+        """Affiche la place de la ligne sélectionnée dans le fichier final, si elle a été traitée."""
+        if not self.waveform_view.pyramid or current.row() not in self.line_rows:
+            return
+        index = self.line_rows.index(current.row())
+        if index < len(self.line_slots):
+            offset, frames = self.line_slots[index]
+            self.waveform_view.set_range(offset, offset + frames)
+
     def get_pipeline_data(self):
         """Récupère les paramètres globaux et les associations MIDI/paroles."""
         # Paramètres globaux
@@ -185,57 +236,18 @@ class MainWindow(QMainWindow):
             "output_file": self.output_file_input.text().strip(),
         }
 
-        # Associations MIDI/paroles
-        associations = []
-        for row in range(self.table.rowCount()):
-            # Récupérer chaque cellule ou widget pour la ligne
-            midi_item = self.table.item(row, 1)  # Colonne MIDI
-            lyrics_item = self.table.item(row, 2)  # Colonne Paroles
-            duration_widget = self.table.cellWidget(row, 3)  # Spinbox Durée
-            pitch_widget = self.table.cellWidget(row, 4)  # Spinbox Pitch
-
-            # Vérifier si toutes les données nécessaires sont présentes et valides
-            if (
-                midi_item and midi_item.text().strip() and
-                lyrics_item and lyrics_item.text().strip() and
-                duration_widget and pitch_widget
-            ):
-                associations.append((
-                    midi_item.text().strip(),  # Chemin du fichier MIDI
-                    lyrics_item.text().strip(),  # Ligne de paroles
-                    duration_widget.value(),  # Durée (int)
-                    pitch_widget.value()  # Pitch (int)
-                ))
-
+        # Associations MIDI/paroles, et ligne du tableau de chacune
+        associations, self.line_rows = self.line_model.pipeline_lines()
         return global_params, associations
 
-    def check_and_add_row(self):
-        """Vérifie si la dernière ligne est remplie et ajoute une nouvelle ligne si nécessaire."""
-        last_row = self.table.rowCount() - 1
-        if last_row >= 0:
-            midi_item = self.table.item(last_row, 1)  # Colonne Fichier MIDI
-            lyrics_item = self.table.item(last_row, 2)  # Colonne Paroles
-            duration_widget = self.table.cellWidget(last_row, 3)  # Colonne Durée
-            pitch_widget = self.table.cellWidget(last_row, 4)  # Colonne Pitch
-
-            if (
-                midi_item and midi_item.text().strip() and
-                lyrics_item and lyrics_item.text().strip() and
-                duration_widget and pitch_widget
-            ):
-                # Ajouter une nouvelle ligne si la dernière est remplie
-                self.add_table_row()
-
     def generate_lyrics_file(self):
         """
         Génère un fichier temporaire contenant les lignes de paroles saisies dans l'UI.
         """
         lyrics_file = "lignes_UI.txt"
         with open(lyrics_file, "w", encoding="utf-8") as file:
-            for row in range(self.table.rowCount()):
-                lyrics_item = self.table.item(row, 1)  # Colonne "Ligne de paroles"
-                if lyrics_item and lyrics_item.text().strip():
-                    file.write(lyrics_item.text().strip() + "\n")
+            for _, lyrics, _, _ in self.line_model.pipeline_lines()[0]:
+                file.write(lyrics + "\n")
         return lyrics_file
 
     def run_pipeline(self):
@@ -268,38 +280,82 @@ class MainWindow(QMainWindow):
 
         self.log("Lancement du pipeline...")
 
-        try:
-            all_wave_files = []
-            for midi_file, lyrics, duration, pitch in associations:
-                wave_file = self.pipeline_runner.run_pipeline(
-                    midi_file=midi_file,
-                    lyrics=lyrics,
-                    duration=duration,
-                    pitch=pitch,
-                    custom_rvc_model_url=custom_rvc_model_url,
-                )
-                all_wave_files.append(wave_file)
-            
-            # Concaténez les fichiers audio générés
-            output_file = global_params["output_file"]
-            
-            # Uniformisations des différents waves
-            uniform_wave_files = []
-            for wave_file in all_wave_files:
-                uniform_file = wave_file.replace(".wav", "_uniform.wav")
-                convert_to_uniform_format(wave_file, uniform_file)
-                uniform_wave_files.append(uniform_file)
-
-            # Concaténation avec les fichiers uniformisés
-            concatenate_audio(output_file, uniform_wave_files)
-            
-            # Nettoyage final
-            clean_all_temporary_files(len(uniform_wave_files))
-            
-            self.log(f"Pipeline terminé avec succès. Fichier final : {output_file}", "RÉUSSI")
-        
-        except Exception as e:
-            self.log(f"Erreur lors de l'exécution du pipeline : {str(e)}", "ERREUR")
+        # Le pipeline tourne dans un thread du QThreadPool : la fenêtre reste réactive
+        self.line_times = {}
+        self.line_model.set_statuses(self.line_rows, "En attente")
+        self.progress_bar.setRange(0, len(associations))
+        self.progress_bar.setValue(0)
+
+        self.worker = PipelineWorker(
+            self.pipeline_runner, associations, custom_rvc_model_url, global_params["output_file"],
+            jobs=self.jobs_spinbox.value(),
+        )
+        self.worker.signals.progress.connect(self.on_line_progress)
+        self.worker.signals.finished.connect(self.on_pipeline_finished)
+        self.worker.signals.failed.connect(self.on_pipeline_failed)
+        self.worker.signals.cancelled.connect(self.on_pipeline_cancelled)
+        self.set_running(True)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def cancel_pipeline(self):
+        """Demande l'arrêt du pipeline en cours ; les étapes déjà lancées se terminent d'abord."""
+        if self.worker:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.log("Annulation demandée...", "INFO")
+
+    def set_running(self, running):
+        """Active ou désactive les commandes selon qu'un pipeline est en cours."""
+        self.run_pipeline_button.setEnabled(not running)
+        self.add_row_button.setEnabled(not running)
+        self.import_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def on_line_progress(self, index, stage, status, elapsed):
+        """Met à jour la ligne du tableau correspondant à une étape signalée par le worker."""
+        row = self.line_rows[index]
+        label = STAGE_LABELS.get(stage, stage)
+        if status == "terminé":
+            self.line_times[index] = self.line_times.get(index, 0.0) + elapsed
+        total = self.line_times.get(index)
+        elapsed_text = f"{total:.1f} s" if total is not None else ""
+
+        if stage == "final" and status == "terminé":
+            self.line_model.set_status(row, "Terminée", elapsed_text)
+            self.progress_bar.setValue(self.progress_bar.value() + 1)
+        elif status == "erreur":
+            self.line_model.set_status(row, f"Erreur ({label})", elapsed_text)
+        else:
+            self.line_model.set_status(row, f"{label} : {status}", elapsed_text)
+
+    def on_pipeline_finished(self, output_file):
+        self.set_running(False)
+        self.line_slots = self.worker.slots
+        self.waveform_view.set_pyramid(self.worker.pyramid)
+        self.show_mix_button.setEnabled(self.worker.pyramid is not None)
+        self.worker = None
+        self.log(f"Pipeline terminé avec succès. Fichier final : {output_file}", "RÉUSSI")
+
+    def on_pipeline_failed(self, message):
+        self.set_running(False)
+        self.worker = None
+        self.log(f"Erreur lors de l'exécution du pipeline : {message}", "ERREUR")
+
+    def on_pipeline_cancelled(self):
+        self.set_running(False)
+        self.worker = None
+        for index, row in enumerate(self.line_rows):
+            if self.line_model.status(row) != "Terminée":
+                total = self.line_times.get(index)
+                self.line_model.set_status(row, "Annulée", f"{total:.1f} s" if total is not None else "")
+        self.log("Pipeline annulé.", "INFO")
+
+    def closeEvent(self, event):
+        """Annule le pipeline en cours et attend la fin du worker avant de fermer la fenêtre."""
+        if self.worker:
+            self.worker.cancel()
+            QThreadPool.globalInstance().waitForDone()
+        super().closeEvent(event)
 
 def main():
     app = QApplication([])
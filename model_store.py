@@ -0,0 +1,180 @@
+# model_store.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import urllib.error
+import urllib.request
+from datetime import datetime
+from cache import default_cache_root, file_lock, hash_file
+
+
+# Durée de validité supposée d'un envoi quand Replicate n'indique pas d'expiration (secondes)
+UPLOAD_TTL = 23 * 3600
+# Marge avant expiration : une URL sur le point d'expirer est renvoyée, un traitement pouvant durer
+UPLOAD_EXPIRY_MARGIN = 3600
+
+
+class ChecksumError(ValueError):
+    """L'empreinte d'un modèle téléchargé ne correspond pas à celle attendue."""
+
+
+def is_url(source):
+    """Indique si la source d'un modèle est une URL HTTP(S)."""
+    return source.startswith("http://") or source.startswith("https://")
+
+
+def upload_expiry(uploaded, now=None):
+    """
+    Date d'expiration (horodatage Unix) d'un fichier envoyé à Replicate.
+    :param uploaded: Objet renvoyé par replicate.files.create.
+    :param now: Horodatage de l'envoi (par défaut : maintenant).
+    :return: Champ expires_at de la réponse s'il est lisible, sinon now + UPLOAD_TTL.
+    """
+    now = time.time() if now is None else now
+    expires_at = getattr(uploaded, "expires_at", None)
+    if expires_at:
+        try:
+            return datetime.fromisoformat(str(expires_at).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return now + UPLOAD_TTL
+
+
+class ModelStore:
+    """
+    Registre local des modèles RVC, rangés par empreinte SHA-256.
+    Chaque modèle n'est téléchargé qu'une fois (avec reprise via les requêtes Range)
+    puis exposé au backend RVC : chemin local, ou URL d'upload mémorisée pour Replicate.
+    """
+
+    def __init__(self, root=None, logger=print):
+        """
+        :param root: Dossier du registre (par défaut : sous-dossier "models" du cache).
+        :param logger: Fonction de log.
+        """
+        self.root = root or os.path.join(default_cache_root(), "models")
+        self.logger = logger
+        os.makedirs(os.path.join(self.root, "downloads"), exist_ok=True)
+        self.index_file = os.path.join(self.root, "index.json")
+        self.lock_file = os.path.join(self.root, ".lock")
+
+    def _read_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"sources": {}, "uploads": {}}
+
+    def _write_index(self, index):
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_file)
+
+    def model_path(self, digest):
+        """Chemin du modèle stocké sous une empreinte donnée."""
+        return os.path.join(self.root, f"{digest}.zip")
+
+    def fetch(self, source, sha256=None):
+        """
+        Renvoie le chemin local d'un modèle, en le téléchargeant ou en l'important une seule fois.
+        :param source: URL du modèle ou chemin d'un fichier ZIP local.
+        :param sha256: Empreinte attendue (facultatif) ; vérifiée après téléchargement.
+        :return: Chemin du modèle dans le registre.
+        :raises ChecksumError: Si l'empreinte ne correspond pas.
+        """
+        sha256 = sha256.lower() if sha256 else None
+        with file_lock(self.lock_file):
+            index = self._read_index()
+            digest = sha256 or index["sources"].get(source)
+            if digest and os.path.exists(self.model_path(digest)):
+                return self.model_path(digest)
+
+            if is_url(source):
+                partial = os.path.join(
+                    self.root, "downloads", hashlib.sha256(source.encode("utf-8")).hexdigest() + ".part"
+                )
+                self._download(source, partial)
+            else:
+                if not os.path.exists(source):
+                    raise FileNotFoundError(f"Modèle RVC introuvable : {source}")
+                partial = source
+
+            digest = hash_file(partial)
+            if sha256 and digest != sha256:
+                if partial != source:
+                    os.remove(partial)
+                raise ChecksumError(
+                    f"Empreinte du modèle invalide pour {source} : {digest} (attendu : {sha256})"
+                )
+
+            if partial == source:
+                shutil.copyfile(source, self.model_path(digest))
+            else:
+                os.replace(partial, self.model_path(digest))
+            index["sources"][source] = digest
+            self._write_index(index)
+            self.logger(f"Modèle RVC enregistré : {source} -> {self.model_path(digest)}")
+            return self.model_path(digest)
+
+    def _download(self, url, partial, chunk_size=1024 * 1024):
+        """
+        Télécharge une URL vers un fichier partiel, en reprenant là où un essai précédent s'est arrêté.
+        """
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            response = urllib.request.urlopen(request)
+        except urllib.error.HTTPError as e:
+            if e.code != 416:  # 416 : le fichier partiel est déjà complet
+                raise
+            return
+
+        with response:
+            # Un serveur qui ignore Range renvoie 200 : on repart de zéro
+            mode = "ab" if offset and response.status == 206 else "wb"
+            if mode == "ab":
+                self.logger(f"Reprise du téléchargement de {url} à {offset} octets")
+            with open(partial, mode) as f:
+                shutil.copyfileobj(response, f, chunk_size)
+
+    def remote_url(self, source, sha256=None):
+        """
+        Renvoie une URL utilisable par Replicate pour un modèle.
+        Les URL sont transmises telles quelles ; un fichier local est importé dans le registre
+        puis envoyé à Replicate, l'URL obtenue étant mémorisée par empreinte avec sa date
+        d'expiration : le modèle est renvoyé une fois cette date (moins une marge) dépassée.
+        :param source: URL du modèle ou chemin d'un fichier ZIP local.
+        :param sha256: Empreinte attendue (facultatif).
+        :return: URL du modèle.
+        """
+        if is_url(source):
+            if sha256:
+                self.fetch(source, sha256)
+            return source
+
+        model_path = self.fetch(source, sha256)
+        digest = os.path.splitext(os.path.basename(model_path))[0]
+        with file_lock(self.lock_file):
+            index = self._read_index()
+            upload = index["uploads"].get(digest)
+            # Les entrées d'avant l'expiration (simple URL) n'ont pas de date connue : on renvoie le modèle
+            if isinstance(upload, dict) and upload.get("expires_at", 0) - UPLOAD_EXPIRY_MARGIN > time.time():
+                return upload["url"]
+
+            if upload:
+                self.logger(f"URL d'envoi du modèle RVC expirée, nouvel envoi : {source}")
+            else:
+                self.logger(f"Envoi du modèle RVC local vers Replicate : {source}")
+            import replicate  # import lent, seulement pour l'envoi vers Replicate
+
+            with open(model_path, "rb") as f:
+                uploaded = replicate.files.create(f)
+            url = uploaded.urls["get"]
+            index["uploads"][digest] = {"url": url, "expires_at": upload_expiry(uploaded)}
+            self._write_index(index)
+            return url
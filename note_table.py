@@ -0,0 +1,235 @@
+# note_table.py
+import io
+import os
+import struct
+import numpy as np
+from mido import MidiFile, MidiTrack, Message
+
+NOTE_DTYPE = np.dtype([
+    ("track", np.uint16),
+    ("channel", np.uint8),
+    ("pitch", np.uint8),
+    ("velocity", np.uint8),
+    ("start", np.int64),      # en ticks depuis le début du morceau
+    ("duration", np.int64),   # en ticks
+])
+
+
+class NoteTable:
+    """
+    Notes d'un fichier MIDI sous forme de tableau NumPy structuré (piste, canal, hauteur,
+    vélocité, début, durée), construit en une seule lecture du fichier. Les étapes de
+    préparation du MIDI travaillent sur ce tableau, et le fichier MIDI n'est écrit qu'une fois.
+    """
+
+    def __init__(self, notes, ticks_per_beat, name=None):
+        """
+        :param notes: Tableau structuré de type NOTE_DTYPE, trié par piste puis par début.
+        :param ticks_per_beat: Résolution du fichier MIDI.
+        :param name: Nom du fichier MIDI correspondant (journalisation, noms des fichiers produits).
+        """
+        self.notes = notes
+        self.ticks_per_beat = ticks_per_beat
+        self.name = name
+
+    def __len__(self):
+        return len(self.notes)
+
+    def track(self, index):
+        """Notes d'une piste, dans l'ordre de leur début."""
+        return self.notes[self.notes["track"] == index]
+
+    def pitches(self, track=None):
+        """
+        Hauteurs des notes d'une piste, dans l'ordre de leur début.
+        :param track: Index de la piste (par défaut : première piste contenant des notes).
+        """
+        if track is None:
+            if len(self.notes) == 0:
+                return self.notes["pitch"]
+            track = int(self.notes["track"].min())
+        return self.track(track)["pitch"]
+
+
+# Nombre d'octets de données des messages de canal, selon le quartet de poids fort du statut
+_DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+
+def _read_varlen(data, position):
+    """Lit une quantité de longueur variable MIDI. :return: Tuple (valeur, position suivante)."""
+    value = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return value, position
+
+
+def _scan_track(data, track_index, rows, meta=None):
+    """
+    Parcourt les événements d'une piste (octets bruts) et ajoute ses notes à rows.
+    Seuls les note_on / note_off sont décodés ; les autres événements sont sautés.
+    Si meta est une liste, les méta-événements de tempo (0x51) et de signature rythmique (0x58)
+    y sont ajoutés sous la forme (tick, type, données).
+    """
+    position, end = 0, len(data)
+    now = 0
+    status = 0
+    open_notes = {}
+    while position < end:
+        delta, position = _read_varlen(data, position)
+        now += delta
+        byte = data[position]
+        if byte >= 0x80:
+            position += 1
+            if byte == 0xFF:
+                meta_type = data[position]
+                length, position = _read_varlen(data, position + 1)
+                if meta is not None and meta_type in (0x51, 0x58):
+                    meta.append((now, meta_type, data[position:position + length]))
+                position += length
+                continue
+            if byte in (0xF0, 0xF7):
+                length, position = _read_varlen(data, position)
+                position += length
+                continue
+            status = byte
+        # Sinon : statut courant (running status), l'octet lu est déjà une donnée
+        kind = status & 0xF0
+        if kind in (0x80, 0x90):
+            note, velocity = data[position], data[position + 1]
+            key = (status & 0x0F, note)
+            if kind == 0x90 and velocity > 0:
+                open_notes.setdefault(key, []).append((now, len(rows)))
+                rows.append((track_index, status & 0x0F, note, velocity, now, 0))
+            else:
+                pending = open_notes.get(key)
+                if pending:
+                    start, row = pending.pop(0)
+                    rows[row] = rows[row][:5] + (now - start,)
+        position += _DATA_BYTES.get(kind, 0)
+    for pending in open_notes.values():
+        for start, row in pending:
+            rows[row] = rows[row][:5] + (now - start,)
+
+
+def read_note_table(midi_file, meta=None):
+    """
+    Lit toutes les notes d'un fichier MIDI (toutes pistes) en une seule passe.
+    Les octets du fichier sont parcourus directement, sans créer un objet par message.
+    Chaque note_on est associée au note_off suivant de même canal et de même hauteur ;
+    une note restée ouverte se termine à la fin de sa piste.
+
+    :param midi_file: Chemin du fichier MIDI.
+    :param meta: Liste recevant les événements de tempo et de signature rythmique (voir _scan_track).
+    :return: NoteTable du fichier.
+    :raises ValueError: Si le fichier n'est pas un fichier MIDI standard.
+    """
+    with open(midi_file, "rb") as f:
+        data = f.read()
+    if data[:4] != b"MThd":
+        raise ValueError(f"Fichier MIDI invalide : {midi_file}")
+    header_length, _, track_count, division = struct.unpack(">IHHH", data[4:14])
+    if division & 0x8000:
+        raise ValueError(f"Division temporelle SMPTE non prise en charge : {midi_file}")
+
+    rows = []
+    position = 8 + header_length
+    track_index = 0
+    while track_index < track_count and position + 8 <= len(data):
+        chunk_id, length = struct.unpack(">4sI", data[position:position + 8])
+        position += 8
+        if chunk_id == b"MTrk":
+            _scan_track(data[position:position + length], track_index, rows, meta)
+            track_index += 1
+        position += length
+
+    notes = np.array(rows, dtype=NOTE_DTYPE)
+    # Tri stable : l'ordre des messages est conservé pour les notes simultanées
+    notes = notes[np.lexsort((notes["start"], notes["track"]))]
+    return NoteTable(notes, division, name=os.path.basename(midi_file))
+
+
+def vary_note_table(table, adjusted_durations, track=None, velocity=64):
+    """
+    Répartit les hauteurs d'une piste sur les durées des syllabes, avec une variation cyclique
+    de -2 à +2 demi-tons (même résultat que add_note_variation puis create_midi_with_variations).
+
+    :param table: NoteTable du MIDI d'origine.
+    :param adjusted_durations: Durées des syllabes, en temps.
+    :param track: Piste dont les hauteurs sont reprises (par défaut : première piste contenant des notes,
+                  ce qui couvre les fichiers de type 1 dont la piste 0 ne contient que le tempo).
+    :param velocity: Vélocité des notes produites.
+    :return: Nouvelle NoteTable monophonique, sur une seule piste.
+    :raises ValueError: Si le fichier ne contient aucune note.
+    """
+    pitches = table.pitches(track)
+    if len(pitches) == 0:
+        raise ValueError("Aucune note valide trouvée dans le fichier MIDI original.")
+
+    count = len(adjusted_durations)
+    variation = np.arange(count) % 5 - 2
+    notes = np.zeros(count, dtype=NOTE_DTYPE)
+    notes["pitch"] = np.clip(np.resize(pitches, count).astype(np.int64) + variation, 0, 127)
+    notes["velocity"] = velocity
+    # Même conversion en ticks que create_midi_with_variations (troncature note par note)
+    notes["duration"] = [int(duration * table.ticks_per_beat) for duration in adjusted_durations]
+    notes["start"] = np.concatenate(([0], np.cumsum(notes["duration"])[:-1])) if count else []
+    return NoteTable(notes, table.ticks_per_beat)
+
+
+def note_table_to_midi(table):
+    """
+    Construit le fichier MIDI d'une NoteTable (une piste MIDI par piste de la table).
+    À un même instant, les fins de notes précèdent les débuts de notes.
+
+    :param table: NoteTable à écrire.
+    :return: Objet mido.MidiFile.
+    """
+    midi = MidiFile(ticks_per_beat=table.ticks_per_beat)
+    notes = table.notes
+    track_count = int(notes["track"].max()) + 1 if len(notes) else 1
+    for track_index in range(track_count):
+        track_notes = notes[notes["track"] == track_index]
+        count = len(track_notes)
+        order = np.arange(count)
+        times = np.concatenate((track_notes["start"], track_notes["start"] + track_notes["duration"]))
+        is_off = np.concatenate((np.zeros(count, dtype=bool), np.ones(count, dtype=bool)))
+        # Fins de notes d'abord ; une note de durée nulle garde son note_off juste après son note_on
+        priority = np.where(is_off & (np.tile(track_notes["duration"], 2) > 0), 0, 1)
+        events = np.lexsort((is_off, np.tile(order, 2), priority, times))
+        deltas = np.diff(np.concatenate(([0], times[events])))
+
+        index = events % max(count, 1)
+        channels = track_notes["channel"][index].tolist()
+        pitches = track_notes["pitch"][index].tolist()
+        velocities = track_notes["velocity"][index].tolist()
+        kinds = np.where(is_off[events], "note_off", "note_on").tolist()
+
+        track = MidiTrack()
+        for kind, channel, pitch, velocity, delta in zip(kinds, channels, pitches, velocities, deltas.tolist()):
+            track.append(Message(kind, channel=channel, note=pitch, velocity=velocity, time=delta))
+        midi.tracks.append(track)
+    return midi
+
+
+def note_table_to_bytes(table):
+    """
+    Sérialise une NoteTable en fichier MIDI standard, en mémoire.
+    :param table: NoteTable à écrire.
+    :return: Contenu du fichier MIDI (bytes).
+    """
+    buffer = io.BytesIO()
+    note_table_to_midi(table).save(file=buffer)
+    return buffer.getvalue()
+
+
+def write_note_table(table, output_file):
+    """
+    Écrit une NoteTable dans un fichier MIDI.
+    :param table: NoteTable à écrire.
+    :param output_file: Chemin du fichier MIDI de sortie.
+    """
+    note_table_to_midi(table).save(output_file)
+    print(f"[RÉUSSI] Fichier MIDI avec variations généré : {output_file}")
@@ -0,0 +1,95 @@
+# peaks.py
+import numpy as np
+
+BASE_BLOCK = 256  # trames par point du niveau le plus fin
+
+
+class PeakPyramid:
+    """
+    Pics (minimum, maximum) d'un fichier audio à plusieurs résolutions : le niveau 0 résume
+    BASE_BLOCK trames par point, et chaque niveau suivant regroupe deux points du précédent.
+    Un affichage de forme d'onde ne lit que le niveau adapté à son zoom, jamais les échantillons.
+    """
+
+    def __init__(self, levels, sample_rate, frames, channels, base_block=BASE_BLOCK):
+        """
+        :param levels: Liste de tableaux int16 de forme (points, 2) : minimum et maximum de chaque bloc,
+                       tous canaux confondus.
+        :param sample_rate: Fréquence d'échantillonnage du fichier.
+        :param frames: Nombre de trames du fichier.
+        :param channels: Nombre de canaux du fichier.
+        :param base_block: Nombre de trames par point du niveau 0.
+        """
+        self.levels = levels
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.channels = channels
+        self.base_block = base_block
+
+    @property
+    def duration(self):
+        """Durée du fichier en secondes."""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def window(self, start_frame, end_frame, width):
+        """
+        Pics d'un intervalle du fichier, réduits à au plus width colonnes.
+        Le niveau utilisé est le plus grossier qui garde au moins un point par colonne.
+
+        :param start_frame: Première trame de l'intervalle.
+        :param end_frame: Fin de l'intervalle (exclue).
+        :param width: Nombre de colonnes de l'affichage.
+        :return: Tuple (minimums, maximums), tableaux int16 d'au plus width valeurs.
+        """
+        start_frame, end_frame = max(0, int(start_frame)), min(self.frames, int(end_frame))
+        if end_frame <= start_frame or width <= 0 or not self.levels:
+            empty = np.zeros(0, dtype=np.int16)
+            return empty, empty
+
+        frames_per_column = (end_frame - start_frame) / width
+        level = int(np.clip(np.floor(np.log2(max(frames_per_column / self.base_block, 1))), 0, len(self.levels) - 1))
+        block = self.base_block << level
+        peaks = self.levels[level][start_frame // block:-(-end_frame // block)]
+        if len(peaks) <= width:
+            return peaks[:, 0], peaks[:, 1]
+
+        edges = np.unique(np.linspace(0, len(peaks), width + 1).astype(np.int64)[:-1])
+        return np.minimum.reduceat(peaks[:, 0], edges), np.maximum.reduceat(peaks[:, 1], edges)
+
+
+def _build_levels(level0):
+    """Construit les niveaux successifs en regroupant les points deux par deux."""
+    levels = [level0]
+    while len(levels[-1]) > 1:
+        previous = levels[-1]
+        if len(previous) % 2:
+            previous = np.concatenate((previous, previous[-1:]))
+        pairs = previous.reshape(-1, 2, 2)
+        levels.append(np.stack((pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)), axis=1))
+    return levels
+
+
+def compute_peaks(audio_file, base_block=BASE_BLOCK, block_frames=BASE_BLOCK * 1024):
+    """
+    Calcule la pyramide de pics d'un fichier audio en le lisant par blocs (mémoire constante).
+
+    :param audio_file: Chemin du fichier audio.
+    :param base_block: Nombre de trames par point du niveau 0.
+    :param block_frames: Nombre de trames lues à la fois (multiple de base_block).
+    :return: PeakPyramid.
+    """
+    import soundfile as sf
+
+    chunks = []
+    with sf.SoundFile(audio_file) as sound_file:
+        sample_rate, channels, frames = sound_file.samplerate, sound_file.channels, sound_file.frames
+        for block in sound_file.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+            count = -(-len(block) // base_block)
+            if len(block) % base_block:
+                # Dernier bloc incomplet : complété en répétant sa dernière trame
+                block = np.concatenate((block, np.repeat(block[-1:], count * base_block - len(block), axis=0)))
+            samples = block.reshape(count, base_block * channels)
+            chunks.append(np.stack((samples.min(axis=1), samples.max(axis=1)), axis=1))
+
+    level0 = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.int16)
+    return PeakPyramid(_build_levels(level0) if len(level0) else [], sample_rate, frames, channels, base_block)
@@ -1,20 +1,79 @@
 import threading
 import os
+import sys
+import shutil
 import wave
 import subprocess
-import replicate
-import urllib.request
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from utility_functions import (
-    format_message, validate_syllables, map_syllables_to_durations, create_midi_with_variations,
-    add_stress_to_durations, match_durations_to_music, adjust_midi_with_syllables,
-    adjust_audio_duration, remove_silence, get_audio_duration, add_note_variation
+    format_message,
+    adjust_audio_duration, remove_silence,
+    console_logger, stitch_audio, split_audio
 )
+from note_table import NoteTable, read_note_table, vary_note_table, note_table_to_bytes
+from scratch import ScratchDirectory, memory_file
+from syllables import analyze_lyrics, analyze_line
+from rhythm import plan_rhythm
+from cache import hash_file, make_key
+from rvc_backends import ReplicateBackend
+from synthesis import synthesize_voice, midi2voice_available
+
+
+def _run_in_worker(job):
+    """
+    Exécute une méthode du pipeline dans un processus du pool.
+    Chaque processus possède son propre PipelineRunner ; les dossiers de travail sont fournis par l'appelant.
+    :param job: Tuple (runner_options, index, method, kwargs).
+    :return: Valeur renvoyée par la méthode.
+    """
+    runner_options, index, method, kwargs = job
+    runner = PipelineRunner(lambda message: console_logger(f"[Ligne {index}] {message}"), **runner_options)
+    return getattr(runner, method)(**kwargs)
 
 class PipelineRunner:
-    def __init__(self, logger):
+    def __init__(self, logger, scratch_root=None, use_tmpfs=False, cache=None,
+                 model_store=None, rvc_model_sha256=None, rvc_backend=None, synth_mode="inprocess",
+                 synth_pool=None):
         self.logger = logger
+        self.synth_mode = synth_mode
+        self.synth_pool = synth_pool
+        self.rvc_backend = rvc_backend or ReplicateBackend()
+        self.cache = cache
+        self.model_store = model_store
+        self.rvc_model_sha256 = rvc_model_sha256
+        self.resolved_models = {}
         self.lock = threading.Lock()
         self.wave_files = []
+        self.scratch_root = scratch_root
+        self.use_tmpfs = use_tmpfs
+        self.scratch_dirs = []
+
+    def worker_options(self):
+        """Paramètres permettant de recréer un runner équivalent dans un autre processus."""
+        return {
+            "scratch_root": self.scratch_root,
+            "use_tmpfs": self.use_tmpfs,
+            "cache": self.cache,
+            "model_store": self.model_store,
+            "rvc_model_sha256": self.rvc_model_sha256,
+            "rvc_backend": self.rvc_backend,
+            "synth_mode": self.synth_mode,
+        }
+
+    def resolve_rvc_model(self, source):
+        """
+        Résout la source du modèle RVC via le registre local et le backend (une seule fois par source).
+        :param source: URL ou chemin local du modèle.
+        :return: Référence du modèle utilisable par le backend RVC (URL ou chemin local).
+        """
+        if not source:
+            return source
+        if source not in self.resolved_models:
+            self.resolved_models[source] = self.rvc_backend.resolve_model(
+                source, self.model_store, self.rvc_model_sha256
+            )
+        return self.resolved_models[source]
 
     def log(self, message, status="INFO"):
         """Logger centralisé pour les messages."""
@@ -28,102 +87,352 @@ class PipelineRunner:
             self.log(f"Fichier texte créé : {filename}", "INFO")
         return filename
 
-    def run_pipeline(self, midi_file, lyrics, duration, pitch, custom_rvc_model_url):
-        """Exécute le pipeline complet pour un fichier MIDI et une ligne de paroles."""
+    def new_scratch(self, prefix="midi_to_singing_"):
+        """Crée un dossier de travail suivi par le runner, supprimé par clean_scratch."""
+        scratch = ScratchDirectory(prefix=prefix, root=self.scratch_root, use_tmpfs=self.use_tmpfs)
+        self.scratch_dirs.append(scratch)
+        return scratch
+
+    def clean_scratch(self):
+        """Supprime tous les dossiers de travail créés par le runner."""
+        for scratch in self.scratch_dirs:
+            scratch.cleanup()
+        self.scratch_dirs = []
+
+    def run_pipeline(self, midi_file, lyrics, duration, pitch, custom_rvc_model_url, scratch=None,
+                     syllables=None, durations=None):
+        """
+        Exécute le pipeline complet pour un fichier MIDI et une ligne de paroles.
+        :param scratch: Dossier de travail (ScratchDirectory) recevant les fichiers intermédiaires.
+                        Créé automatiquement si absent, et supprimé par clean_scratch.
+        :param syllables: Analyse syllabique de la ligne (LineSyllables), calculée si absente.
+        :param durations: Durées des syllabes planifiées pour la ligne (voir plan_lines), calculées si absentes.
+        :return: Chemin du fichier audio final ajusté (situé dans le dossier de travail).
+        """
+        if scratch is None:
+            scratch = self.new_scratch()
+
         try:
-            self.log(f"Début du traitement pour le fichier MIDI : {midi_file}", "INFO")
-            
-            # Étape 1 : Valider les syllabes des paroles
-            syllables = validate_syllables(lyrics)
-            num_syllables = sum(count for _, count in syllables)
-            rythme = self.calculate_tempo(num_syllables, duration)
-
-            # Étape 2 : Ajuster le fichier MIDI en fonction des syllabes
-            adjusted_midi_file = f"adjusted_{os.path.basename(midi_file)}"
-            self.log(f"Ajustement du MIDI : {midi_file}", "INFO")
-            adjusted_durations = self.adjust_midi(syllables, midi_file, adjusted_midi_file)
-
-            # Étape 2.1 : Appliquer des variations de hauteur
-            adjusted_notes = add_note_variation(midi_file, adjusted_durations)
-
-            # Étape 2.2 : Créer un nouveau fichier MIDI avec les variations appliquées
-            adjusted_notes_midi_file = f"notes_adjusted_{os.path.basename(midi_file)}"
-            create_midi_with_variations(adjusted_midi_file, adjusted_notes, adjusted_durations, adjusted_notes_midi_file)
-
-            # Étape 3 : Créer un fichier texte pour les paroles
-            lyrics_file = f"lyrics_{os.path.basename(midi_file).replace('.mid', '.txt')}"
-            self.write_text_to_file(lyrics, lyrics_file)
-
-            # Étape 4 : Conversion MIDI vers audio
-            output_wave = f"voice_{os.path.basename(midi_file)}.wav"
-            self.log("Conversion du MIDI en audio...", "INFO")
-            self.convert_to_audio(adjusted_notes_midi_file, output_wave, lyrics_file, rythme)
-
-            # Étape 5 : Nettoyage et ajustement de l'audio
-            cleaned_wave = f"cleaned_{output_wave}"
-            adjusted_wave = f"adjusted_{output_wave}"
-            self.cleanup_audio(output_wave, cleaned_wave, adjusted_wave, duration)
+            # Étapes 1 à 5 : traitement local (MIDI, synthèse, nettoyage)
+            adjusted_wave = self.prepare_line(midi_file, lyrics, duration, scratch, syllables, durations)
 
             # Étape 6 : Transformation de l'audio avec Replicate
-            final_audio = f"final_{adjusted_wave}"
+            final_audio = scratch.path(f"final_{os.path.basename(adjusted_wave)}")
             self.transform_audio(adjusted_wave, final_audio, pitch, custom_rvc_model_url)
-            
+
             # Étape 7 : Ajuster la durée audio finale
-            adjusted_final_audio = f"final_adjusted_{output_wave}"
-            adjust_audio_duration(final_audio, adjusted_final_audio, duration)
+            return self.finalize_line(final_audio, duration)
 
-            # Renvoi de l'audio final ajusté
-            return adjusted_final_audio
-        
         except Exception as e:
             self.log(f"Erreur lors du traitement de {midi_file} : {str(e)}", "ERREUR")
             raise
 
-    def convert_to_audio(self, adjusted_midi_file, output_wave, lyrics_file, rythme):
-        """Convertit un fichier MIDI ajusté en audio."""
+    def prepare_line(self, midi_file, lyrics, duration, scratch, syllables=None, durations=None):
+        """
+        Étapes locales du pipeline : ajustement du MIDI, synthèse vocale et nettoyage de l'audio.
+        :param midi_file: Chemin du fichier MIDI de la ligne, ou NoteTable d'un segment de morceau.
+        :param scratch: Dossier de travail (ScratchDirectory) recevant les fichiers intermédiaires.
+        :param syllables: Analyse syllabique de la ligne (LineSyllables, voir plan_lines),
+                          calculée si absente.
+        :param durations: Durées des syllabes en temps (voir plan_lines), calculées si absentes.
+        :return: Chemin du fichier audio nettoyé et ajusté, prêt pour la transformation RVC.
+        """
+        work_path = scratch.path
+        if isinstance(midi_file, NoteTable):
+            # Segment d'un morceau complet (voir song_map.SongMidi), déjà découpé en mémoire
+            note_table, midi_file = midi_file, midi_file.name
+        else:
+            note_table, midi_file = None, os.path.abspath(midi_file)
+        self.log(f"Début du traitement pour le fichier MIDI : {midi_file}", "INFO")
+
+        # Étape 1 : Analyser les syllabes des paroles (déjà fait pour tout le morceau par run_lines)
+        if syllables is None:
+            syllables = analyze_line(lyrics)
+        if syllables.total == 0:
+            raise ValueError(f"Aucune syllabe trouvée dans la ligne : {lyrics!r}")
+        rythme = self.calculate_tempo(syllables.total, duration)
+
+        # Étape 2 : Ajuster les durées du MIDI en fonction des syllabes (fichier lu une seule fois)
+        self.log(f"Ajustement du MIDI : {midi_file}", "INFO")
+        if note_table is None:
+            note_table = read_note_table(midi_file)
+        adjusted_durations = durations if durations is not None else self.adjust_midi(syllables)
+
+        # Étape 3 : Appliquer des variations de hauteur ; le MIDI final reste en mémoire
+        midi_data = note_table_to_bytes(vary_note_table(note_table, adjusted_durations))
+
+        # Étape 4 : Conversion MIDI vers audio
+        output_wave = work_path(f"voice_{os.path.basename(midi_file)}.wav")
+        self.log("Conversion du MIDI en audio...", "INFO")
+        self.convert_to_audio(midi_data, output_wave, lyrics, rythme, scratch.root)
+
+        # Étape 5 : Nettoyage et ajustement de l'audio
+        wave_name = os.path.basename(output_wave)
+        cleaned_wave = work_path(f"cleaned_{wave_name}")
+        adjusted_wave = work_path(f"adjusted_{wave_name}")
+        self.cleanup_audio(output_wave, cleaned_wave, adjusted_wave, duration)
+        return adjusted_wave
+
+    def finalize_line(self, final_audio, duration):
+        """
+        Ajuste la durée de l'audio transformé par RVC (le fichier est réécrit sur place).
+        :return: Chemin du fichier audio final ajusté.
+        """
+        adjust_audio_duration(final_audio, final_audio, duration)
+        return final_audio
+
+    def convert_to_audio(self, midi_data, output_wave, lyrics, rythme, work_dir=None):
+        """
+        Convertit un MIDI ajusté en audio.
+        Le MIDI et les paroles sont transmis en mémoire ; ils ne sont exposés sous forme de fichiers
+        (tmpfs ou memfd, voir scratch.memory_file) que lorsque le synthétiseur exige un chemin.
+        Si un pool de synthèse est configuré (voir synth_pool.SynthesisPool), la synthèse lui est confiée.
+        Sinon, par défaut, midi2voice est appelé dans le processus courant et écrit directement output_wave
+        (voir synthesis.synthesize_voice). En mode "subprocess", ou si midi2voice n'est pas importable,
+        il est lancé via `python -m midi2voice` : comme il écrit alors toujours 'voice.wav' dans son
+        dossier courant, il est lancé dans work_dir pour que plusieurs conversions ne se marchent pas dessus.
+        Si un cache est configuré, la synthèse est évitée lorsque le MIDI, les paroles
+        et les arguments de midi2voice sont identiques à un rendu précédent.
+
+        :param midi_data: Contenu du fichier MIDI (bytes), ou chemin d'un fichier MIDI.
+        :param output_wave: Chemin du fichier WAV à produire.
+        :param lyrics: Texte des paroles.
+        :param rythme: Tempo en BPM.
+        :param work_dir: Dossier de travail de la synthèse.
+        """
+        synth_args = [
+            "-lang", "english",
+            "-g", "male",
+            "-i", "0",
+            "-t", str(rythme),
+        ]
+        if isinstance(midi_data, str):
+            with open(midi_data, "rb") as f:
+                midi_data = f.read()
         try:
-            subprocess.run([
-                "python", "-m", "midi2voice",
-                "-l", lyrics_file,
-                "-m", adjusted_midi_file,
-                "-lang", "english",
-                "-g", "male",
-                "-i", "0",
-                "-t", str(rythme),
-            ], check=True)
-            subprocess.run(["mv", "voice.wav", output_wave], check=True)
+            cache_key = None
+            if self.cache:
+                cache_key = make_key(midi_data, lyrics, synth_args)
+                if self.cache.get("synth", cache_key, output_wave):
+                    self.log(f"Audio récupéré depuis le cache : {output_wave}", "INFO")
+                    return
+
+            if self.synth_pool:
+                wav = self.synth_pool.synthesize(midi_data, lyrics, rythme, gender="male")
+                with open(output_wave, "wb") as f:
+                    f.write(wav)
+            elif self.synth_mode == "inprocess" and midi2voice_available():
+                synthesize_voice(midi_data, lyrics, output_wave, rythme, gender="male", work_dir=work_dir)
+            else:
+                with memory_file(midi_data, suffix=".mid") as midi_path, \
+                        memory_file(lyrics.encode("utf-8"), suffix=".txt") as lyrics_path:
+                    subprocess.run([
+                        sys.executable, "-m", "midi2voice",
+                        "-l", lyrics_path,
+                        "-m", midi_path,
+                        *synth_args,
+                    ], check=True, cwd=work_dir)
+                shutil.move(os.path.join(work_dir or ".", "voice.wav"), output_wave)
+            if cache_key:
+                self.cache.put("synth", cache_key, output_wave)
             self.log(f"Audio généré : {output_wave}", "INFO")
         except subprocess.CalledProcessError as e:
             self.log(f"Erreur lors de la conversion MIDI en audio : {e}", "ERREUR")
             raise
-        finally:
-            if os.path.exists(lyrics_file):
-                os.remove(lyrics_file)  # Supprimer le fichier texte temporaire
+
+    def map_lines(self, method, kwargs_list, jobs=1):
+        """
+        Applique une méthode du runner à chaque ligne, dans un pool de processus si jobs > 1.
+        :param method: Nom de la méthode à appeler.
+        :param kwargs_list: Liste des arguments nommés, un dictionnaire par ligne.
+        :param jobs: Nombre de processus à utiliser (1 = exécution séquentielle).
+        :return: Liste des résultats, dans l'ordre des lignes.
+        """
+        if jobs <= 1:
+            return [getattr(self, method)(**kwargs) for kwargs in kwargs_list]
+
+        if self.synth_pool:
+            # La synthèse est déjà répartie sur les processus du pool : des threads suffisent
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                return list(executor.map(lambda kwargs: getattr(self, method)(**kwargs), kwargs_list))
+
+        self.log(f"Traitement de {len(kwargs_list)} lignes sur {jobs} processus...", "ÉTAPE")
+        work_items = [
+            (self.worker_options(), index, method, kwargs)
+            for index, kwargs in enumerate(kwargs_list)
+        ]
+        # "spawn" : un fork depuis un processus multi-thread (interface Qt, pool de threads) peut hériter de verrous bloqués
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # executor.map renvoie les résultats dans l'ordre des lignes
+            return list(executor.map(_run_in_worker, work_items))
+
+    def plan_lines(self, lines):
+        """
+        Analyse les syllabes et planifie le rythme de toutes les lignes en une seule passe,
+        avant la répartition des lignes entre les workers.
+        :param lines: Liste de tuples (midi_file, lyrics, duration, pitch).
+        :return: Tuple (liste des LineSyllables, liste des durées des syllabes en temps), dans l'ordre des lignes.
+        """
+        analysis = analyze_lyrics([lyrics for _, lyrics, _, _ in lines])
+        rhythm = plan_rhythm(analysis.totals)
+        self.log(f"Rythme planifié : {len(analysis)} lignes, {len(rhythm.durations)} syllabes.", "INFO")
+        return analysis.lines(), rhythm.lines()
+
+    def run_lines(self, lines, custom_rvc_model_url, jobs=1, remote_concurrency=None, batch_rvc=False):
+        """
+        Exécute le pipeline pour plusieurs lignes, en parallèle si jobs > 1.
+        :param lines: Liste de tuples (midi_file, lyrics, duration, pitch).
+        :param custom_rvc_model_url: URL ou chemin du modèle RVC personnalisé.
+        :param jobs: Nombre de processus à utiliser (1 = exécution séquentielle).
+        :param remote_concurrency: Si défini, les transformations RVC de toutes les lignes sont
+                                   soumises simultanément au backend RVC, dans cette limite.
+        :param batch_rvc: Envoyer une seule prédiction RVC pour toutes les lignes (voir run_lines_batched).
+        :return: Liste des fichiers audio finaux, dans l'ordre des lignes.
+        :raises ValueError: Si batch_rvc et remote_concurrency sont demandés ensemble.
+        """
+        if batch_rvc and remote_concurrency:
+            raise ValueError("batch_rvc et remote_concurrency sont incompatibles.")
+
+        # Le modèle est téléchargé/envoyé une fois ici plutôt qu'une fois par ligne
+        custom_rvc_model_url = self.resolve_rvc_model(custom_rvc_model_url)
+
+        # Chaque ligne dispose de son propre dossier de travail pour isoler ses fichiers
+        scratches = [self.new_scratch(prefix=f"ligne_{index}_") for index in range(len(lines))]
+        # Les paroles et le rythme de toutes les lignes sont calculés une seule fois, avant la répartition
+        plan = self.plan_lines(lines)
+
+        if batch_rvc:
+            return self.run_lines_batched(lines, custom_rvc_model_url, scratches, jobs, plan)
+        if remote_concurrency:
+            return self.run_lines_async(lines, custom_rvc_model_url, scratches, jobs, remote_concurrency, plan)
+
+        return self.map_lines("run_pipeline", [
+            {
+                "midi_file": midi_file, "lyrics": lyrics, "duration": duration, "pitch": pitch,
+                "custom_rvc_model_url": custom_rvc_model_url, "scratch": scratch,
+                "syllables": line_syllables, "durations": line_durations,
+            }
+            for (midi_file, lyrics, duration, pitch), scratch, line_syllables, line_durations
+            in zip(lines, scratches, *plan)
+        ], jobs)
+
+    def run_lines_batched(self, lines, custom_rvc_model_url, scratches, jobs, plan=None):
+        """
+        Variante de run_lines : les audios nettoyés de toutes les lignes sont assemblés dans un seul
+        fichier, transformés par une seule prédiction RVC (une par hauteur distincte), puis redécoupés
+        selon les positions mémorisées avant l'ajustement final de chaque ligne.
+        """
+        if plan is None:
+            plan = self.plan_lines(lines)
+        adjusted_waves = self.map_lines("prepare_line", [
+            {"midi_file": midi_file, "lyrics": lyrics, "duration": duration, "scratch": scratch,
+             "syllables": line_syllables, "durations": line_durations}
+            for (midi_file, lyrics, duration, _), scratch, line_syllables, line_durations
+            in zip(lines, scratches, *plan)
+        ], jobs)
+
+        final_audios = [
+            scratch.path(f"final_{os.path.basename(adjusted_wave)}")
+            for adjusted_wave, scratch in zip(adjusted_waves, scratches)
+        ]
+
+        # Le pitch fait partie des paramètres RVC : une prédiction par valeur de pitch
+        groups = {}
+        for index, (_, _, _, pitch) in enumerate(lines):
+            groups.setdefault(pitch, []).append(index)
+
+        song_scratch = self.new_scratch(prefix="morceau_")
+        for pitch, indices in groups.items():
+            stitched = song_scratch.path(f"stitched_pitch{pitch}.wav")
+            transformed = song_scratch.path(f"final_stitched_pitch{pitch}.wav")
+            segments, total_frames = stitch_audio([adjusted_waves[i] for i in indices], stitched)
+            self.log(f"Transformation groupée de {len(indices)} lignes (pitch {pitch})...", "ÉTAPE")
+            self.transform_audio(stitched, transformed, pitch, custom_rvc_model_url)
+            split_audio(transformed, segments, total_frames, [final_audios[i] for i in indices])
+
+        return [
+            self.finalize_line(final_audio, duration)
+            for final_audio, (_, _, duration, _) in zip(final_audios, lines)
+        ]
+
+    def run_lines_async(self, lines, custom_rvc_model_url, scratches, jobs, remote_concurrency, plan=None):
+        """
+        Variante de run_lines : étapes locales de toutes les lignes, puis transformations RVC
+        concurrentes (asyncio pour Replicate), puis ajustement final de chaque ligne.
+        """
+        if self.rvc_backend.requires_model and not custom_rvc_model_url:
+            raise ValueError("URL du modèle RVC personnalisée non spécifiée.")
+
+        if plan is None:
+            plan = self.plan_lines(lines)
+        adjusted_waves = self.map_lines("prepare_line", [
+            {"midi_file": midi_file, "lyrics": lyrics, "duration": duration, "scratch": scratch,
+             "syllables": line_syllables, "durations": line_durations}
+            for (midi_file, lyrics, duration, _), scratch, line_syllables, line_durations
+            in zip(lines, scratches, *plan)
+        ], jobs)
+
+        final_audios = []
+        pending = []
+        for (_, _, _, pitch), adjusted_wave, scratch in zip(lines, adjusted_waves, scratches):
+            final_audio = scratch.path(f"final_{os.path.basename(adjusted_wave)}")
+            final_audios.append(final_audio)
+            rvc_params = self.rvc_params(pitch, custom_rvc_model_url)
+            cache_key = self.rvc_cache_key(adjusted_wave, rvc_params)
+            if cache_key and self.cache.get("rvc", cache_key, final_audio):
+                self.log(f"Audio transformé récupéré depuis le cache : {final_audio}", "RÉUSSI")
+                continue
+            pending.append((adjusted_wave, final_audio, rvc_params, cache_key))
+
+        if pending:
+            self.log(
+                f"Transformation de {len(pending)} lignes ({self.rvc_backend.name}, "
+                f"{remote_concurrency} conversions simultanées)...", "ÉTAPE"
+            )
+
+            def transformed(index):
+                # Mise en cache dès la fin de chaque ligne : un échec sur une autre ligne ne la perd pas
+                _, final_audio, _, cache_key = pending[index]
+                if cache_key:
+                    self.cache.put("rvc", cache_key, final_audio)
+                self.log(f"Audio transformé avec succès : {final_audio}", "RÉUSSI")
+
+            self.rvc_backend.transform_many([
+                (adjusted_wave, final_audio, rvc_params)
+                for adjusted_wave, final_audio, rvc_params, _ in pending
+            ], max_concurrency=remote_concurrency, on_done=transformed)
+
+        return [
+            self.finalize_line(final_audio, duration)
+            for final_audio, (_, _, duration, _) in zip(final_audios, lines)
+        ]
 
     def cleanup_audio(self, output_wave, cleaned_wave, adjusted_wave, target_duration):
-        """Nettoie et ajuste l'audio généré."""
-        remove_silence(output_wave, cleaned_wave)
-        cleaned_duration = get_audio_duration(cleaned_wave)
-        self.log(f"Durée après suppression des silences : {cleaned_duration:.2f} secondes", "INFO")
-
-        adjust_audio_duration(cleaned_wave, adjusted_wave, target_duration)
-        final_duration = get_audio_duration(adjusted_wave)
-        self.log(f"Durée finale après ajustement : {final_duration:.2f} secondes", "INFO")
-        
-        if final_duration <= 0:
+        """
+        Nettoie et ajuste l'audio généré.
+        Les durées sont tirées des métadonnées renvoyées par chaque étape, sans relire les fichiers.
+        :return: WavInfo du fichier ajusté.
+        """
+        cleaned_info = remove_silence(output_wave, cleaned_wave)
+        if cleaned_info is None or cleaned_info.frames == 0:
+            raise ValueError(f"Le fichier audio est vide après suppression des silences : {output_wave}")
+        self.log(f"Durée après suppression des silences : {cleaned_info.duration:.2f} secondes", "INFO")
+
+        adjusted_info = adjust_audio_duration(cleaned_wave, adjusted_wave, target_duration)
+        self.log(f"Durée finale après ajustement : {adjusted_info.duration:.2f} secondes", "INFO")
+
+        if adjusted_info.frames <= 0:
             raise ValueError(f"Le fichier audio est vide après suppression des silences : {cleaned_wave}")
+        return adjusted_info
 
-    def adjust_midi(self, syllables, midi_file, adjusted_midi_file):
+    def adjust_midi(self, syllables):
         """
-        Ajuste un fichier MIDI selon les syllabes, tout en conservant les hauteurs des notes.
+        Calcule les durées des notes (en temps), une note par syllabe.
+        Les hauteurs sont reprises du MIDI d'origine par vary_note_table.
+        :param syllables: Analyse syllabique de la ligne (LineSyllables).
         """
-        durations = map_syllables_to_durations(len(syllables))
-        stressed_durations = add_stress_to_durations(durations, [0, 2])
-        adjusted_durations = match_durations_to_music(stressed_durations)
-        
-        # Appeler la fonction mise à jour pour ajuster le MIDI
-        adjust_midi_with_syllables(midi_file, syllables, adjusted_midi_file)
-        
+        adjusted_durations = plan_rhythm([syllables.total]).line(0)
+
         self.log(f"Durées ajustées pour le MIDI : {adjusted_durations}", "INFO")
         return adjusted_durations
 
@@ -132,37 +441,55 @@ class PipelineRunner:
         number_of_beats = 4
         return int((number_of_beats * 60) / target_duration)
 
+    def rvc_params(self, pitch_adjustment, custom_rvc_model_url):
+        """Paramètres du modèle RVC, hors audio d'entrée."""
+        return {
+            "protect": 0.5,
+            "f0_method": "rmvpe",
+            "rvc_model": "CUSTOM",
+            "custom_rvc_model_download_url": custom_rvc_model_url,
+            "index_rate": 0.3,
+            "pitch_change": pitch_adjustment,
+            "rms_mix_rate": 0.25,
+            "filter_radius": 3,
+            "output_format": "wav",
+            "crepe_hop_length": 128,
+        }
+
+    def rvc_cache_key(self, input_file, rvc_params):
+        """Clé de cache d'une transformation RVC, ou None si aucun cache n'est configuré."""
+        if not self.cache:
+            return None
+        return make_key(hash_file(input_file), self.rvc_backend.cache_id(), rvc_params)
+
     def transform_audio(self, input_file, output_file, pitch_adjustment=0, custom_rvc_model_url=None):
-        """Transforme l'audio final avec l'API Replicate."""
+        """
+        Transforme l'audio final avec le backend RVC configuré (Replicate par défaut).
+        Si un cache est configuré, le résultat est réutilisé lorsque l'audio d'entrée
+        et tous les paramètres RVC sont identiques à un rendu précédent.
+        """
         try:
-            if not custom_rvc_model_url:
+            if self.rvc_backend.requires_model and not custom_rvc_model_url:
                 raise ValueError("URL du modèle RVC personnalisée non spécifiée.")
 
+            custom_rvc_model_url = self.resolve_rvc_model(custom_rvc_model_url)
             self.log(f"Utilisation du modèle RVC personnalisé : {custom_rvc_model_url}", "INFO")
 
-            output = replicate.run(
-                "pseudoram/rvc-v2:d18e2e0a6a6d3af183cc09622cebba8555ec9a9e66983261fc64c8b1572b7dce",
-                input={
-                    "protect": 0.5,
-                    "f0_method": "rmvpe",
-                    "rvc_model": "CUSTOM",
-                    "custom_rvc_model_download_url": custom_rvc_model_url,
-                    "input_audio": open(input_file, "rb"),
-                    "index_rate": 0.3,
-                    "pitch_change": pitch_adjustment,
-                    "rms_mix_rate": 0.25,
-                    "filter_radius": 3,
-                    "output_format": "wav",
-                    "crepe_hop_length": 128,
-                }
-            )
+            rvc_params = self.rvc_params(pitch_adjustment, custom_rvc_model_url)
+            cache_key = self.rvc_cache_key(input_file, rvc_params)
+            if cache_key:
+                if self.cache.get("rvc", cache_key, output_file):
+                    self.log(f"Audio transformé récupéré depuis le cache : {output_file}", "RÉUSSI")
+                    return
 
-            if isinstance(output, str):
-                urllib.request.urlretrieve(output, output_file)
-            elif hasattr(output, "url"):
-                urllib.request.urlretrieve(output.url, output_file)
-            else:
-                raise TypeError(f"Type inattendu pour 'output': {type(output)}")
+            with open(input_file, "rb") as f:
+                audio = f.read()
+            converted = self.rvc_backend.convert(audio, rvc_params)
+            with open(output_file, "wb") as f:
+                f.write(converted)
+
+            if cache_key:
+                self.cache.put("rvc", cache_key, output_file)
 
             self.log(f"Audio transformé avec succès : {output_file}", "RÉUSSI")
         except ValueError as ve:
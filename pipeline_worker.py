@@ -0,0 +1,81 @@
+# pipeline_worker.py
+import threading
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from scheduler import PipelineScheduler, PipelineCancelled
+from wav_assembler import WavAssembler
+from peaks import compute_peaks
+
+
+class PipelineSignals(QObject):
+    """
+    Signaux émis par PipelineWorker. L'objet est créé dans le thread de l'interface : les
+    signaux émis depuis le thread du worker sont donc délivrés dans la boucle d'événements Qt.
+    """
+    # Index de la ligne, étape ("local", "distant", "final"), statut, durée de l'étape en secondes
+    progress = pyqtSignal(int, str, str, float)
+    # Chemin du fichier final (les pics du fichier sont alors dans PipelineWorker.pyramid)
+    finished = pyqtSignal(str)
+    # Message d'erreur
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class PipelineWorker(QRunnable):
+    """
+    Exécute le pipeline complet hors du thread de l'interface (QThreadPool), avec
+    l'ordonnanceur en pipeline : les lignes sont traitées en parallèle et écrites dans le
+    fichier final dès qu'elles sont prêtes. L'avancement de chaque ligne et de chaque étape est
+    signalé par PipelineSignals.progress, et cancel() interrompt le traitement entre deux étapes.
+    """
+
+    def __init__(self, runner, lines, custom_rvc_model_url, output_file, jobs=1, remote_concurrency=4):
+        """
+        :param runner: PipelineRunner fournissant les étapes.
+        :param lines: Liste de tuples (midi_file, lyrics, duration, pitch).
+        :param custom_rvc_model_url: URL ou chemin du modèle RVC personnalisé.
+        :param output_file: Chemin du fichier WAV final.
+        :param jobs: Nombre de lignes préparées localement en parallèle.
+        :param remote_concurrency: Nombre de transformations RVC simultanées.
+        """
+        super().__init__()
+        # Le worker reste utilisable (cancel) après la fin de run : il est libéré par Python, pas par Qt
+        self.setAutoDelete(False)
+        self.runner = runner
+        self.lines = lines
+        self.custom_rvc_model_url = custom_rvc_model_url
+        self.output_file = output_file
+        self.jobs = jobs
+        self.remote_concurrency = remote_concurrency
+        self.cancel_event = threading.Event()
+        self.slots = []  # Position (trame de début, nombre de trames) de chaque ligne dans le fichier final
+        self.pyramid = None  # Pics du fichier final, pour l'aperçu de la forme d'onde
+        self.signals = PipelineSignals()
+
+    def cancel(self):
+        """Demande l'arrêt du traitement ; les étapes en cours se terminent d'abord."""
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            with WavAssembler(self.output_file, [duration for _, _, duration, _ in self.lines]) as assembler:
+                scheduler = PipelineScheduler(
+                    self.runner, jobs=self.jobs, remote_concurrency=self.remote_concurrency,
+                    on_progress=self.signals.progress.emit, cancel_event=self.cancel_event, assembler=assembler,
+                )
+                scheduler.run(self.lines, self.custom_rvc_model_url)
+            self.slots = assembler.slots
+            try:
+                # Pics calculés ici, hors du thread de l'interface ; le fichier final est réécrit à chaque
+                # exécution, ils ne sont donc pas enregistrés à côté de lui
+                self.pyramid = compute_peaks(self.output_file)
+            except Exception as e:
+                # Le fichier final est écrit : seul l'aperçu de la forme d'onde manque
+                self.runner.log(f"Aperçu de la forme d'onde indisponible : {e}", "ERREUR")
+            self.signals.finished.emit(self.output_file)
+        except PipelineCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        finally:
+            # Nettoyage final des dossiers de travail
+            self.runner.clean_scratch()
@@ -0,0 +1,164 @@
+# replicate_async.py
+import os
+import json
+import time
+import base64
+import asyncio
+import shutil
+import urllib.request
+from functools import partial
+
+DEFAULT_BASE_URL = "https://api.replicate.com/v1"
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+
+class PredictionError(RuntimeError):
+    """Une prédiction Replicate a échoué, a été annulée ou a dépassé le délai imparti."""
+
+
+def audio_data_uri(input_file):
+    """
+    Encode un fichier WAV en data URI, accepté par l'API Replicate comme entrée de fichier.
+    :param input_file: Chemin du fichier audio.
+    :return: Chaîne "data:audio/wav;base64,...".
+    """
+    with open(input_file, "rb") as f:
+        return "data:audio/wav;base64," + base64.b64encode(f.read()).decode("ascii")
+
+
+class AsyncReplicateClient:
+    """
+    Client asyncio minimal pour l'API des prédictions Replicate.
+    Les prédictions de toutes les lignes sont soumises simultanément, dans la limite de
+    max_concurrency, puis attendues et téléchargées en parallèle. Si l'une échoue, les
+    prédictions encore en cours sont annulées.
+    L'URL de base est configurable pour pouvoir viser un serveur local qui imite l'API.
+    """
+
+    def __init__(self, token=None, base_url=None, max_concurrency=4, poll_interval=1.0, timeout=900,
+                 request_timeout=60):
+        """
+        :param token: Clé API (par défaut : REPLICATE_API_TOKEN).
+        :param base_url: URL de l'API (par défaut : REPLICATE_API_BASE_URL ou l'API publique).
+        :param max_concurrency: Nombre maximal de prédictions en cours simultanément.
+        :param poll_interval: Intervalle entre deux interrogations d'une prédiction (en secondes).
+        :param timeout: Durée maximale d'une prédiction (en secondes).
+        :param request_timeout: Délai de connexion et de lecture de chaque requête HTTP (en secondes).
+        """
+        self.token = token or os.getenv("REPLICATE_API_TOKEN")
+        self.base_url = (base_url or os.getenv("REPLICATE_API_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.request_timeout = request_timeout
+
+    def _request_sync(self, method, url, payload=None):
+        """Requête HTTP bloquante vers l'API, exécutée dans un thread par _request."""
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(url, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        with urllib.request.urlopen(request, timeout=self.request_timeout) as response:
+            return json.load(response)
+
+    def _download_sync(self, url, output_file):
+        with urllib.request.urlopen(url, timeout=self.request_timeout) as response, open(output_file, "wb") as f:
+            shutil.copyfileobj(response, f)
+
+    async def _run_blocking(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(function, *args))
+
+    async def _request(self, method, url, payload=None):
+        return await self._run_blocking(self._request_sync, method, url, payload)
+
+    async def predict(self, version, model_input):
+        """
+        Crée une prédiction puis l'interroge jusqu'à son achèvement. Une prédiction abandonnée
+        (délai dépassé, tâche annulée) est annulée chez Replicate.
+        :param version: Version du modèle, au format "owner/model:version_id" ou "version_id".
+        :param model_input: Dictionnaire des entrées du modèle.
+        :return: Sortie de la prédiction.
+        :raises PredictionError: Si la prédiction échoue ou dépasse le délai.
+        """
+        version_id = version.split(":", 1)[-1]
+        prediction = await self._request(
+            "POST", f"{self.base_url}/predictions", {"version": version_id, "input": model_input}
+        )
+        deadline = time.monotonic() + self.timeout
+        try:
+            while prediction["status"] not in TERMINAL_STATUSES:
+                if time.monotonic() > deadline:
+                    raise PredictionError(f"Délai dépassé pour la prédiction {prediction.get('id')}")
+                await asyncio.sleep(self.poll_interval)
+                prediction = await self._request("GET", prediction["urls"]["get"])
+        except BaseException:
+            await self.cancel(prediction)
+            raise
+
+        if prediction["status"] != "succeeded":
+            raise PredictionError(
+                f"Prédiction {prediction.get('id')} {prediction['status']} : {prediction.get('error')}"
+            )
+        return prediction["output"]
+
+    async def cancel(self, prediction):
+        """Annule une prédiction en cours (sans effet si elle est terminée ; les erreurs sont ignorées)."""
+        cancel_url = prediction.get("urls", {}).get("cancel")
+        if not cancel_url or prediction.get("status") in TERMINAL_STATUSES:
+            return
+        try:
+            await self._request("POST", cancel_url)
+        except Exception:
+            pass
+
+    async def download(self, url, output_file):
+        """Télécharge la sortie d'une prédiction vers un fichier."""
+        await self._run_blocking(self._download_sync, url, output_file)
+
+    async def transform(self, semaphore, version, input_file, output_file, params):
+        """
+        Transforme un fichier audio : envoi, attente de la prédiction et téléchargement du résultat.
+        :param semaphore: Sémaphore limitant le nombre de prédictions simultanées.
+        :param params: Paramètres du modèle, hors "input_audio".
+        :return: Chemin du fichier de sortie.
+        """
+        async with semaphore:
+            audio = await self._run_blocking(audio_data_uri, input_file)
+            output = await self.predict(version, {**params, "input_audio": audio})
+            if isinstance(output, list):
+                output = output[0]
+            if not isinstance(output, str):
+                raise TypeError(f"Type inattendu pour 'output': {type(output)}")
+            await self.download(output, output_file)
+        return output_file
+
+    async def transform_many(self, version, jobs, on_done=None):
+        """
+        Transforme plusieurs fichiers audio simultanément.
+        Dès qu'une transformation échoue, les autres sont annulées (les prédictions en cours le sont
+        chez Replicate) puis l'erreur est propagée ; les transformations déjà terminées restent écrites.
+
+        :param version: Version du modèle.
+        :param jobs: Liste de tuples (input_file, output_file, params).
+        :param on_done: Fonction appelée (dans un thread) avec l'index de chaque job dès qu'il est terminé.
+        :return: Liste des fichiers de sortie, dans l'ordre des jobs.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index, input_file, output_file, params):
+            await self.transform(semaphore, version, input_file, output_file, params)
+            if on_done:
+                await self._run_blocking(on_done, index)
+            return output_file
+
+        tasks = [asyncio.ensure_future(run(index, *job)) for index, job in enumerate(jobs)]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Laisse les tâches annulées envoyer leurs demandes d'annulation
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
@@ -0,0 +1,117 @@
+# rhythm.py
+import numpy as np
+
+# Durées musicales possibles, en temps (de la quadruple croche à la ronde pointée)
+MUSIC_TEMPS = (0.0625, 0.125, 0.25, 0.33, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0)
+
+# Allongement (en temps) des syllabes accentuées
+STRESS_DURATION = 0.5
+
+
+class RhythmPlan:
+    """
+    Durées des syllabes de toutes les lignes d'un morceau, calculées en une seule passe.
+    Les durées sont rangées dans un seul tableau, et offsets donne la première syllabe de chaque ligne.
+    """
+
+    def __init__(self, durations, offsets):
+        """
+        :param durations: Tableau des durées (en temps), ligne après ligne.
+        :param offsets: Tableau des indices de la première syllabe de chaque ligne (plus la fin).
+        """
+        self.durations = durations
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line(self, index):
+        """Durées d'une ligne (liste de flottants, en temps)."""
+        return self.durations[self.offsets[index]:self.offsets[index + 1]].tolist()
+
+    def lines(self):
+        """Durées de toutes les lignes."""
+        return [self.line(index) for index in range(len(self))]
+
+
+def _line_index(offsets):
+    """Index de la ligne de chaque élément d'un tableau découpé par offsets."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def quantize_durations(durations, music_temps=MUSIC_TEMPS, nearest=False):
+    """
+    Remplace chaque durée par une durée musicale de la table, par dichotomie (searchsorted).
+    Par défaut, la plus grande durée de la table strictement inférieure est retenue (la plus petite
+    si aucune ne l'est), comme dans l'ancien match_durations_to_music.
+
+    :param durations: Tableau des durées, en temps.
+    :param music_temps: Durées musicales possibles.
+    :param nearest: Retenir la durée la plus proche (la plus longue en cas d'égalité).
+    :return: Tableau des durées musicales.
+    """
+    table = np.sort(np.asarray(music_temps, dtype=np.float64))
+    durations = np.asarray(durations, dtype=np.float64)
+    index = np.searchsorted(table, durations, side="left")
+    below = table[np.maximum(index - 1, 0)]
+    if not nearest:
+        return below
+    above = table[np.minimum(index, len(table) - 1)]
+    return np.where(np.abs(above - durations) <= np.abs(durations - below), above, below)
+
+
+def rebalance_measures(durations, offsets, beats_per_measure=4):
+    """
+    Ramène le total de chaque ligne à sa mesure en corrigeant sa dernière durée.
+    Si la correction rendait la dernière durée nulle ou négative (ligne très chargée),
+    toutes les durées de la ligne sont réduites proportionnellement.
+
+    :param durations: Tableau des durées de toutes les lignes, en temps.
+    :param offsets: Indices de la première durée de chaque ligne (plus la fin).
+    :param beats_per_measure: Nombre de temps de la mesure, commun ou un par ligne.
+    :return: Nouveau tableau des durées.
+    """
+    durations = np.array(durations, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    beats = np.broadcast_to(np.asarray(beats_per_measure, dtype=np.float64), (len(offsets) - 1,))
+    filled = np.diff(offsets) > 0
+    if not filled.any():
+        return durations
+
+    starts = offsets[:-1][filled]
+    lasts = offsets[1:][filled] - 1
+    # Somme séquentielle par ligne (les lignes vides ne contiennent aucun élément)
+    totals = np.add.reduceat(durations, starts)
+    patched = durations[lasts] + (beats[filled] - totals)
+
+    overflow = patched <= 0
+    if overflow.any():
+        scale = np.ones(len(offsets) - 1)
+        scale[np.flatnonzero(filled)[overflow]] = beats[filled][overflow] / totals[overflow]
+        durations *= scale[_line_index(offsets)]
+    durations[lasts[~overflow]] = patched[~overflow]
+    return durations
+
+
+def plan_rhythm(syllable_counts, beats_per_measure=4, stressed_syllables=(0, 2), music_temps=MUSIC_TEMPS):
+    """
+    Calcule les durées des syllabes de toutes les lignes en une seule passe vectorisée :
+    répartition égale de la mesure, accent tonique, quantification sur les durées musicales
+    puis rééquilibrage de chaque mesure.
+
+    :param syllable_counts: Nombre de syllabes de chaque ligne.
+    :param beats_per_measure: Nombre de temps de la mesure, commun ou un par ligne.
+    :param stressed_syllables: Positions (dans la ligne) des syllabes accentuées.
+    :param music_temps: Durées musicales possibles.
+    :return: RhythmPlan.
+    """
+    counts = np.asarray(syllable_counts, dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    beats = np.broadcast_to(np.asarray(beats_per_measure, dtype=np.float64), counts.shape)
+    line_index = _line_index(offsets)
+    position = np.arange(offsets[-1]) - offsets[:-1][line_index]
+
+    durations = (beats / np.maximum(counts, 1))[line_index]
+    durations = durations + np.where(np.isin(position, stressed_syllables), STRESS_DURATION, 0.0)
+    durations = rebalance_measures(quantize_durations(durations, music_temps), offsets, beats)
+    return RhythmPlan(durations, offsets)
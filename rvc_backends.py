@@ -0,0 +1,227 @@
+# rvc_backends.py
+import io
+import os
+import zipfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+REQUEST_TIMEOUT = 60  # secondes, pour le téléchargement d'un résultat
+RVC_VERSION = "pseudoram/rvc-v2:d18e2e0a6a6d3af183cc09622cebba8555ec9a9e66983261fc64c8b1572b7dce"
+
+
+class RvcBackend:
+    """
+    Interface commune des backends de conversion de voix.
+    Un backend reçoit l'audio WAV sous forme d'octets et renvoie l'audio converti sous la même forme.
+    """
+
+    name = None
+    requires_model = True
+
+    def cache_id(self):
+        """Identifiant du backend inclus dans les clés de cache des conversions."""
+        return self.name
+
+    def resolve_model(self, source, model_store=None, sha256=None):
+        """
+        Prépare la source du modèle pour ce backend (URL distante, chemin local...).
+        :return: Référence du modèle à placer dans les paramètres RVC.
+        """
+        return source
+
+    def convert(self, audio, params):
+        """
+        Convertit un audio WAV.
+        :param audio: Contenu du fichier WAV d'entrée (bytes).
+        :param params: Paramètres RVC (voir PipelineRunner.rvc_params).
+        :return: Contenu du fichier WAV converti (bytes).
+        """
+        raise NotImplementedError
+
+    def transform_many(self, jobs, max_concurrency=4, on_done=None):
+        """
+        Convertit plusieurs fichiers en parallèle. Dès qu'une conversion échoue, celles qui
+        n'ont pas commencé sont abandonnées ; la première erreur est propagée une fois les
+        conversions en cours terminées.
+        :param jobs: Liste de tuples (input_file, output_file, params).
+        :param max_concurrency: Nombre maximal de conversions simultanées.
+        :param on_done: Fonction appelée avec l'index de chaque job dès qu'il est terminé.
+        """
+        def transform(job):
+            input_file, output_file, params = job
+            with open(input_file, "rb") as f:
+                audio = f.read()
+            with open(output_file, "wb") as f:
+                f.write(self.convert(audio, params))
+
+        first_error = None
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {executor.submit(transform, job): index for index, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                error = future.exception()
+                if error is None:
+                    # Les conversions déjà lancées se terminent et restent signalées, même après un échec
+                    if on_done:
+                        on_done(futures[future])
+                elif first_error is None:
+                    first_error = error
+                    for other in futures:
+                        other.cancel()
+        if first_error is not None:
+            raise first_error
+
+
+class ReplicateBackend(RvcBackend):
+    """Conversion distante avec le modèle pseudoram/rvc-v2 sur Replicate."""
+
+    name = "replicate"
+
+    def __init__(self, version=RVC_VERSION):
+        self.version = version
+
+    def cache_id(self):
+        return self.version
+
+    def resolve_model(self, source, model_store=None, sha256=None):
+        if model_store:
+            return model_store.remote_url(source, sha256)
+        return source
+
+    def convert(self, audio, params):
+        import urllib.request
+        import replicate  # import lent, seulement pour ce backend
+
+        output = replicate.run(self.version, input={**params, "input_audio": io.BytesIO(audio)})
+        if isinstance(output, str):
+            url = output
+        elif hasattr(output, "url"):
+            url = output.url
+        else:
+            raise TypeError(f"Type inattendu pour 'output': {type(output)}")
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
+            return response.read()
+
+    def transform_many(self, jobs, max_concurrency=4, on_done=None):
+        import asyncio
+        from replicate_async import AsyncReplicateClient
+
+        client = AsyncReplicateClient(max_concurrency=max_concurrency)
+        asyncio.run(client.transform_many(self.version, jobs, on_done))
+
+
+class LocalRvcBackend(RvcBackend):
+    """
+    Conversion locale sur CPU avec le paquet optionnel rvc-python (pip install rvc-python).
+    Le modèle est récupéré via le registre local puis chargé une seule fois par processus.
+    """
+
+    name = "local"
+
+    def __init__(self, device="cpu:0"):
+        self.device = device
+        self._inference = None
+        self._loaded_model = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Le modèle chargé n'est pas transmis aux processus du pool : chacun le recharge
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_inference"] = None
+        state["_loaded_model"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def resolve_model(self, source, model_store=None, sha256=None):
+        if model_store:
+            return model_store.fetch(source, sha256)
+        return source
+
+    def _load(self, model_zip):
+        """Extrait le modèle (.pth et .index) à côté de l'archive et le charge si nécessaire."""
+        if self._loaded_model == model_zip:
+            return self._inference
+        try:
+            from rvc_python.infer import RVCInference
+        except ImportError as e:
+            raise ImportError(
+                "Le backend RVC local nécessite le paquet 'rvc-python' (pip install rvc-python)."
+            ) from e
+
+        model_dir = os.path.splitext(model_zip)[0]
+        if not os.path.isdir(model_dir):
+            with zipfile.ZipFile(model_zip) as archive:
+                archive.extractall(model_dir)
+        files = [os.path.join(root, name) for root, _, names in os.walk(model_dir) for name in names]
+        weights = [f for f in files if f.endswith(".pth")]
+        indexes = [f for f in files if f.endswith(".index")]
+        if not weights:
+            raise ValueError(f"Aucun fichier .pth trouvé dans le modèle : {model_zip}")
+
+        if self._inference is None:
+            self._inference = RVCInference(device=self.device)
+        self._inference.load_model(weights[0], index_path=indexes[0] if indexes else "")
+        self._loaded_model = model_zip
+        return self._inference
+
+    def convert(self, audio, params):
+        with self._lock:
+            return self._convert(audio, params)
+
+    def _convert(self, audio, params):
+        inference = self._load(params["custom_rvc_model_download_url"])
+        inference.set_params(
+            f0up_key=params["pitch_change"],
+            f0method=params["f0_method"],
+            index_rate=params["index_rate"],
+            filter_radius=params["filter_radius"],
+            rms_mix_rate=params["rms_mix_rate"],
+            protect=params["protect"],
+        )
+        with tempfile.TemporaryDirectory(prefix="rvc_local_") as work_dir:
+            input_file = os.path.join(work_dir, "input.wav")
+            output_file = os.path.join(work_dir, "output.wav")
+            with open(input_file, "wb") as f:
+                f.write(audio)
+            inference.infer_file(input_file, output_file)
+            with open(output_file, "rb") as f:
+                return f.read()
+
+    def transform_many(self, jobs, max_concurrency=4, on_done=None):
+        # Un seul modèle chargé par processus : les conversions locales sont sérialisées
+        super().transform_many(jobs, max_concurrency=1, on_done=on_done)
+
+
+class PassthroughBackend(RvcBackend):
+    """Backend sans conversion, qui renvoie l'audio tel quel (tests, mesures, rendu sans RVC)."""
+
+    name = "passthrough"
+    requires_model = False
+
+    def convert(self, audio, params):
+        return audio
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (ReplicateBackend, LocalRvcBackend, PassthroughBackend)
+}
+
+
+def get_backend(name=None):
+    """
+    Instancie un backend par son nom.
+    :param name: "replicate", "local" ou "passthrough" (par défaut : variable
+                 MIDI_TO_SINGING_RVC_BACKEND, sinon "replicate").
+    :return: Instance de RvcBackend.
+    """
+    name = name or os.getenv("MIDI_TO_SINGING_RVC_BACKEND") or "replicate"
+    if name not in BACKENDS:
+        raise ValueError(f"Backend RVC inconnu : {name} (disponibles : {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]()
@@ -0,0 +1,150 @@
+# scheduler.py
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pipeline_runner import _run_in_worker
+
+
+class PipelineCancelled(Exception):
+    """Le traitement a été annulé avant la fin de toutes les lignes."""
+
+
+class PipelineScheduler:
+    """
+    Ordonnanceur en pipeline : la ligne N+1 est synthétisée et nettoyée localement pendant que
+    la ligne N est transformée à distance, et l'ajustement final de chaque ligne démarre dès
+    que sa transformation se termine. La durée d'un morceau tend ainsi vers
+    max(traitement local, traitement distant) plutôt que vers leur somme.
+    """
+
+    def __init__(self, runner, jobs=1, remote_concurrency=4, on_progress=None, cancel_event=None, assembler=None):
+        """
+        :param runner: PipelineRunner fournissant les étapes.
+        :param jobs: Nombre de lignes préparées localement en parallèle (processus si > 1,
+                     threads si le runner utilise un pool de synthèse).
+        :param remote_concurrency: Nombre de transformations distantes simultanées.
+        :param on_progress: Fonction appelée avec (index, étape, statut, durée en secondes).
+        :param cancel_event: threading.Event permettant d'interrompre le traitement.
+        :param assembler: WavAssembler dans lequel chaque ligne est écrite dès qu'elle est finalisée.
+        """
+        self.runner = runner
+        self.jobs = max(1, jobs)
+        self.remote_concurrency = max(1, remote_concurrency)
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.assembler = assembler
+
+    def _progress(self, index, stage, status, elapsed=0.0):
+        if self.on_progress:
+            self.on_progress(index, stage, status, elapsed)
+
+    def _start(self, started, index, stage):
+        """Note le début réel d'une étape et le signale (et non sa mise en file d'attente)."""
+        started[(index, stage)] = time.monotonic()
+        self._progress(index, stage, "en cours")
+
+    def _run_stage(self, started, index, stage, function, *args):
+        """Exécute une étape dans un thread d'un exécuteur, en notant son début réel."""
+        self._start(started, index, stage)
+        return function(*args)
+
+    def _transform(self, adjusted_wave, final_audio, pitch, custom_rvc_model_url):
+        self.runner.transform_audio(adjusted_wave, final_audio, pitch, custom_rvc_model_url)
+        return final_audio
+
+    def _finalize(self, index, final_audio, duration):
+        final_audio = self.runner.finalize_line(final_audio, duration)
+        if self.assembler:
+            self.assembler.write_line(index, final_audio)
+        return final_audio
+
+    def run(self, lines, custom_rvc_model_url):
+        """
+        Traite toutes les lignes en chevauchant les étapes locales et distantes.
+        :param lines: Liste de tuples (midi_file, lyrics, duration, pitch).
+        :param custom_rvc_model_url: URL ou chemin du modèle RVC personnalisé.
+        :return: Liste des fichiers audio finaux, dans l'ordre des lignes.
+        :raises PipelineCancelled: Si cancel_event est déclenché.
+        """
+        runner = self.runner
+        custom_rvc_model_url = runner.resolve_rvc_model(custom_rvc_model_url)
+        scratches = [runner.new_scratch(prefix=f"ligne_{index}_") for index in range(len(lines))]
+        syllables, durations = runner.plan_lines(lines)
+        results = [None] * len(lines)
+        started = {}
+
+        # Avec un pool de synthèse, les préparations locales tournent dans des threads
+        use_processes = self.jobs > 1 and not runner.synth_pool
+        if use_processes:
+            # "spawn" : un fork depuis le thread de travail de l'interface Qt peut hériter de verrous bloqués
+            local_executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            local_executor = ThreadPoolExecutor(max_workers=self.jobs)
+        remote_executor = ThreadPoolExecutor(max_workers=self.remote_concurrency)
+        post_executor = ThreadPoolExecutor(max_workers=1)
+
+        def submit_local(index):
+            midi_file, lyrics, duration, _ = lines[index]
+            kwargs = {
+                "midi_file": midi_file, "lyrics": lyrics, "duration": duration, "scratch": scratches[index],
+                "syllables": syllables[index], "durations": durations[index],
+            }
+            if use_processes:
+                future = local_executor.submit(
+                    _run_in_worker, (runner.worker_options(), index, "prepare_line", kwargs)
+                )
+            else:
+                future = local_executor.submit(runner.prepare_line, **kwargs)
+            pending[future] = (index, "local")
+            # Au plus jobs préparations soumises à la fois : chacune démarre dès sa soumission
+            self._start(started, index, "local")
+
+        pending = {}
+        next_local = min(self.jobs, len(lines))
+        try:
+            for index in range(next_local):
+                submit_local(index)
+
+            while pending:
+                if self.cancel_event.is_set():
+                    raise PipelineCancelled("Traitement annulé.")
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, stage = pending.pop(future)
+                    elapsed = time.monotonic() - started[(index, stage)]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        self._progress(index, stage, "erreur", elapsed)
+                        raise
+                    self._progress(index, stage, "terminé", elapsed)
+                    _, _, duration, pitch = lines[index]
+
+                    if stage == "local":
+                        if next_local < len(lines):
+                            submit_local(next_local)
+                            next_local += 1
+                        final_audio = scratches[index].path(f"final_{os.path.basename(result)}")
+                        next_future = remote_executor.submit(
+                            self._run_stage, started, index, "distant",
+                            self._transform, result, final_audio, pitch, custom_rvc_model_url,
+                        )
+                        pending[next_future] = (index, "distant")
+                    elif stage == "distant":
+                        next_future = post_executor.submit(
+                            self._run_stage, started, index, "final", self._finalize, index, result, duration
+                        )
+                        pending[next_future] = (index, "final")
+                    else:
+                        results[index] = result
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+        finally:
+            for executor in (local_executor, remote_executor, post_executor):
+                executor.shutdown(wait=True)
+
+        return results
@@ -0,0 +1,114 @@
+# scratch.py
+import os
+import shutil
+import tempfile
+import contextlib
+
+TMPFS_ROOT = "/dev/shm"
+
+
+def default_scratch_root(use_tmpfs=False):
+    """
+    Détermine le dossier parent des dossiers de travail.
+    :param use_tmpfs: Utiliser un système de fichiers en mémoire (/dev/shm) s'il est disponible.
+    :return: Chemin du dossier parent, ou None pour le dossier temporaire du système.
+    """
+    root = os.getenv("MIDI_TO_SINGING_SCRATCH_DIR")
+    if root:
+        return root
+    if use_tmpfs and os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        return TMPFS_ROOT
+    return None
+
+
+@contextlib.contextmanager
+def memory_file(data, suffix=""):
+    """
+    Expose des données en mémoire sous forme de chemin, pour les outils qui n'acceptent qu'un fichier.
+    Le fichier est créé sur tmpfs (/dev/shm) lorsqu'il est disponible, ce qui conserve l'extension
+    dont certains outils ont besoin pour reconnaître le format ; sinon dans un fichier anonyme
+    memfd (Linux, chemin /proc/<pid>/fd/<n>, sans extension), et en dernier recours dans le
+    dossier temporaire du système. Le fichier est supprimé à la sortie du bloc.
+
+    :param data: Contenu du fichier (bytes).
+    :param suffix: Extension du fichier (par exemple ".mid").
+    :return: Gestionnaire de contexte fournissant le chemin du fichier.
+    """
+    if os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        directory = TMPFS_ROOT
+    elif hasattr(os, "memfd_create"):
+        fd = os.memfd_create("midi_to_singing")
+        try:
+            os.write(fd, data)
+            yield f"/proc/{os.getpid()}/fd/{fd}"
+        finally:
+            os.close(fd)
+        return
+    else:
+        directory = None
+
+    fd, file_path = tempfile.mkstemp(suffix=suffix, prefix="midi_to_singing_", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield file_path
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+class ScratchDirectory:
+    """
+    Dossier de travail propre à une exécution ou à une ligne.
+    Chaque fichier intermédiaire y est enregistré au moment de sa création,
+    et l'ensemble est supprimé en une fois à la fin du traitement ou en cas d'échec.
+    """
+
+    def __init__(self, prefix="midi_to_singing_", root=None, use_tmpfs=False):
+        """
+        :param prefix: Préfixe du nom du dossier créé.
+        :param root: Dossier parent (par défaut : voir default_scratch_root).
+        :param use_tmpfs: Créer le dossier sur tmpfs (/dev/shm) si possible.
+        """
+        parent = root or default_scratch_root(use_tmpfs)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix=prefix, dir=parent)
+        self.files = []
+
+    def path(self, name):
+        """
+        Renvoie le chemin d'un fichier intermédiaire dans le dossier et l'enregistre.
+        :param name: Nom du fichier (sans dossier).
+        :return: Chemin absolu du fichier.
+        """
+        return self.register(os.path.join(self.root, os.path.basename(name)))
+
+    def register(self, file_path):
+        """
+        Enregistre un fichier intermédiaire, même situé hors du dossier, pour qu'il soit supprimé.
+        :param file_path: Chemin du fichier.
+        :return: Chemin absolu du fichier.
+        """
+        file_path = os.path.abspath(file_path)
+        if file_path not in self.files:
+            self.files.append(file_path)
+        return file_path
+
+    def cleanup(self):
+        """Supprime tous les fichiers enregistrés puis le dossier lui-même."""
+        for file_path in self.files:
+            if not file_path.startswith(self.root + os.sep) and os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+        self.files = []
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
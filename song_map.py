@@ -0,0 +1,171 @@
+# song_map.py
+import os
+import bisect
+import numpy as np
+from note_table import NoteTable, read_note_table
+
+DEFAULT_TEMPO = 500000  # microsecondes par noire (120 BPM), valeur par défaut de la norme MIDI
+
+
+class TempoMap:
+    """
+    Correspondance ticks -> secondes d'un fichier MIDI, construite une fois à partir des
+    changements de tempo. Les recherches se font par dichotomie sur les ticks des changements.
+    """
+
+    def __init__(self, ticks_per_beat, changes=()):
+        """
+        :param ticks_per_beat: Résolution du fichier MIDI.
+        :param changes: Changements de tempo (tick, microsecondes par noire), dans n'importe quel ordre.
+        """
+        self.ticks_per_beat = ticks_per_beat
+        self.ticks = [0]
+        self.tempos = [DEFAULT_TEMPO]
+        for tick, tempo in sorted(changes):
+            if tick == self.ticks[-1]:
+                self.tempos[-1] = tempo
+            else:
+                self.ticks.append(tick)
+                self.tempos.append(tempo)
+        # Temps écoulé (en secondes) au début de chaque segment de tempo constant
+        self.offsets = [0.0]
+        for index in range(1, len(self.ticks)):
+            span = self.ticks[index] - self.ticks[index - 1]
+            self.offsets.append(self.offsets[-1] + span * self.tempos[index - 1] / 1e6 / ticks_per_beat)
+
+    def seconds(self, tick):
+        """Position en secondes d'un tick."""
+        index = bisect.bisect_right(self.ticks, tick) - 1
+        return self.offsets[index] + (tick - self.ticks[index]) * self.tempos[index] / 1e6 / self.ticks_per_beat
+
+    def seconds_array(self, ticks):
+        """Positions en secondes d'un tableau de ticks (version vectorisée de seconds)."""
+        ticks = np.asarray(ticks)
+        index = np.searchsorted(self.ticks, ticks, side="right") - 1
+        tempos = np.asarray(self.tempos)[index]
+        return np.asarray(self.offsets)[index] + (ticks - np.asarray(self.ticks)[index]) * tempos / 1e6 / self.ticks_per_beat
+
+    def tempo_at(self, tick):
+        """Tempo (microsecondes par noire) en vigueur à un tick."""
+        return self.tempos[bisect.bisect_right(self.ticks, tick) - 1]
+
+
+class MeasureIndex:
+    """
+    Index des débuts de mesures d'un fichier MIDI, construit une fois à partir des signatures
+    rythmiques (4/4 par défaut). Une signature qui ne tombe pas sur une barre de mesure
+    commence une nouvelle mesure.
+    """
+
+    def __init__(self, ticks_per_beat, signatures=(), end_tick=0):
+        """
+        :param ticks_per_beat: Résolution du fichier MIDI.
+        :param signatures: Signatures rythmiques (tick, numérateur, dénominateur).
+        :param end_tick: Fin du morceau en ticks ; les mesures sont indexées jusqu'à ce point.
+        """
+        changes = {0: (4, 4)}
+        for tick, numerator, denominator in sorted(signatures):
+            changes[tick] = (numerator, denominator)
+        change_ticks = sorted(changes)
+
+        self.starts = []
+        for index, tick in enumerate(change_ticks):
+            numerator, denominator = changes[tick]
+            length = max(1, int(round(numerator * ticks_per_beat * 4 / denominator)))
+            limit = change_ticks[index + 1] if index + 1 < len(change_ticks) else max(end_tick, tick + 1)
+            self.starts.extend(range(tick, limit, length))
+        self.end_tick = max(end_tick, self.starts[-1] + 1)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def bounds(self, first, count=1):
+        """
+        Ticks de début et de fin d'un groupe de mesures.
+        :param first: Index de la première mesure.
+        :param count: Nombre de mesures.
+        :return: Tuple (tick de début, tick de fin).
+        """
+        last = first + count
+        end = self.starts[last] if last < len(self.starts) else self.end_tick
+        return self.starts[first], end
+
+    def measure_at(self, tick):
+        """Index de la mesure contenant un tick."""
+        return max(0, bisect.bisect_right(self.starts, tick) - 1)
+
+
+class SongMidi:
+    """
+    Fichier MIDI d'un morceau complet, lu une seule fois : table des notes, carte des tempos
+    et index des mesures. Les segments d'une ligne (une ou plusieurs mesures) sont découpés à la
+    demande, sans relire le fichier ni écrire de fichier MIDI par ligne.
+    """
+
+    def __init__(self, midi_file):
+        """
+        :param midi_file: Chemin du fichier MIDI du morceau.
+        """
+        self.midi_file = midi_file
+        meta = []
+        self.table = read_note_table(midi_file, meta=meta)
+        ticks_per_beat = self.table.ticks_per_beat
+
+        tempos = [(tick, int.from_bytes(data[:3], "big")) for tick, kind, data in meta if kind == 0x51]
+        signatures = [(tick, data[0], 2 ** data[1]) for tick, kind, data in meta if kind == 0x58 and len(data) >= 2]
+        notes = self.table.notes
+        end_tick = int((notes["start"] + notes["duration"]).max()) if len(notes) else 0
+        end_tick = max([end_tick] + [tick for tick, _, _ in meta])
+
+        self.tempo_map = TempoMap(ticks_per_beat, tempos)
+        self.measures = MeasureIndex(ticks_per_beat, signatures, end_tick)
+        # Débuts des notes triés, pour retrouver les notes d'un segment par dichotomie
+        self._order = np.argsort(notes["start"], kind="stable")
+        self._starts = notes["start"][self._order]
+        # Une note tenue jusque dans un segment commence au plus _max_duration ticks avant lui
+        self._max_duration = int(notes["duration"].max()) if len(notes) else 0
+
+    def segments(self, measures_per_line=1, first_measure=0):
+        """
+        Découpe le morceau en segments de mesures consécutives.
+        :param measures_per_line: Nombre de mesures par segment (au moins 1).
+        :param first_measure: Index de la mesure du premier segment.
+        :return: Liste de tuples (première mesure, nombre de mesures).
+        :raises ValueError: Si measures_per_line est inférieur à 1 ou si first_measure est hors du morceau.
+        """
+        if measures_per_line < 1:
+            raise ValueError(f"Le nombre de mesures par ligne doit être au moins 1 (reçu : {measures_per_line}).")
+        if not 0 <= first_measure < len(self.measures):
+            raise ValueError(
+                f"La première mesure doit être comprise entre 0 et {len(self.measures) - 1} "
+                f"(reçu : {first_measure})."
+            )
+        return [
+            (first, min(measures_per_line, len(self.measures) - first))
+            for first in range(first_measure, len(self.measures), measures_per_line)
+        ]
+
+    def line(self, first, count=1):
+        """
+        Notes d'un segment de mesures, ramenées au début du segment. Une note tenue depuis le
+        segment précédent y figure à partir du début du segment, et les notes qui dépassent la fin
+        du segment sont écourtées.
+        :param first: Index de la première mesure.
+        :param count: Nombre de mesures.
+        :return: NoteTable du segment.
+        """
+        start, end = self.measures.bounds(first, count)
+        low, high = np.searchsorted(self._starts, [start - self._max_duration, end], side="left")
+        notes = self.table.notes[np.sort(self._order[low:high])]
+        notes = notes[(notes["start"] >= start) | (notes["start"] + notes["duration"] > start)].copy()
+        ends = np.minimum(notes["start"] + notes["duration"], end)
+        notes["start"] = np.maximum(notes["start"], start)
+        notes["duration"] = ends - notes["start"]
+        notes["start"] -= start
+        base_name = os.path.splitext(os.path.basename(self.midi_file))[0]
+        return NoteTable(notes, self.table.ticks_per_beat, name=f"{base_name}-Mesure{first}.mid")
+
+    def duration(self, first, count=1):
+        """Durée d'un segment de mesures en secondes, selon la carte des tempos."""
+        start, end = self.measures.bounds(first, count)
+        return self.tempo_map.seconds(end) - self.tempo_map.seconds(start)
@@ -0,0 +1,104 @@
+# syllables.py
+import functools
+from string import punctuation
+from collections import namedtuple
+import numpy as np
+
+
+@functools.lru_cache(maxsize=65536)
+def count_syllables(word):
+    """
+    Nombre de syllabes d'un mot (syllapy), mémorisé : les mots répétés (refrains) ne sont
+    analysés qu'une fois. Un mot contenant au moins une lettre compte au moins une syllabe.
+
+    :param word: Mot normalisé (minuscules, sans ponctuation autour, voir normalize_word).
+    :return: Nombre de syllabes.
+    """
+    import syllapy  # import lent (métadonnées du paquet), fait au premier mot inconnu
+
+    count = syllapy.count(word)
+    if count == 0 and any(char.isalpha() for char in word):
+        count = 1
+    return count
+
+
+def normalize_word(word):
+    """Forme d'un mot utilisée comme clé du cache : minuscules, sans ponctuation autour."""
+    return word.lower().strip(punctuation)
+
+
+class LineSyllables(namedtuple("LineSyllables", ["words", "counts"])):
+    """Syllabes d'une ligne de paroles : mots et nombre de syllabes de chaque mot."""
+    __slots__ = ()
+
+    @property
+    def total(self):
+        """Nombre total de syllabes de la ligne."""
+        return int(sum(self.counts))
+
+    def pairs(self):
+        """Liste de tuples (mot, nombre de syllabes)."""
+        return list(zip(self.words, self.counts))
+
+
+class LyricsSyllables:
+    """
+    Analyse syllabique compacte d'un fichier de paroles : les nombres de syllabes de tous les mots
+    sont rangés dans un seul tableau, et offsets donne le premier mot de chaque ligne.
+    """
+
+    def __init__(self, words, counts, offsets):
+        """
+        :param words: Liste de tous les mots, ligne après ligne.
+        :param counts: Tableau des nombres de syllabes, un par mot.
+        :param offsets: Tableau des indices du premier mot de chaque ligne (plus la fin).
+        """
+        self.words = words
+        self.counts = counts
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line(self, index):
+        """Syllabes d'une ligne (LineSyllables)."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return LineSyllables(tuple(self.words[start:end]), tuple(self.counts[start:end].tolist()))
+
+    def lines(self):
+        """Syllabes de toutes les lignes."""
+        return [self.line(index) for index in range(len(self))]
+
+    @property
+    def totals(self):
+        """Nombre total de syllabes de chaque ligne (tableau)."""
+        cumulative = np.concatenate(([0], np.cumsum(self.counts, dtype=np.int64)))
+        return cumulative[self.offsets[1:]] - cumulative[self.offsets[:-1]]
+
+
+def analyze_lyrics(lines):
+    """
+    Analyse les syllabes de toutes les lignes d'un fichier de paroles en un seul appel.
+    Chaque mot distinct n'est compté qu'une fois par appel, et le cache de count_syllables
+    est partagé entre les appels.
+
+    :param lines: Lignes de paroles (chaînes).
+    :return: LyricsSyllables.
+    """
+    words = []
+    offsets = [0]
+    for line in lines:
+        words.extend(line.split())
+        offsets.append(len(words))
+
+    known = {}
+    for word in words:
+        if word not in known:
+            known[word] = count_syllables(normalize_word(word))
+    counts = np.fromiter((known[word] for word in words), dtype=np.uint16, count=len(words))
+    return LyricsSyllables(words, counts, np.asarray(offsets, dtype=np.int64))
+
+
+def analyze_line(line):
+    """Analyse les syllabes d'une seule ligne de paroles. :return: LineSyllables."""
+    return analyze_lyrics([line]).line(0)
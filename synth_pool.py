@@ -0,0 +1,195 @@
+# synth_pool.py
+import os
+import time
+import queue
+import tempfile
+import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SynthesisError(RuntimeError):
+    """La synthèse a échoué dans un processus du pool, ou le processus ne répond plus."""
+
+
+def _synthesize_job(job):
+    """Exécute une synthèse dans le processus du pool et renvoie le WAV produit (bytes)."""
+    from synthesis import synthesize_voice
+
+    with tempfile.TemporaryDirectory(prefix="synth_pool_") as work_dir:
+        output_wave = os.path.join(work_dir, "voice.wav")
+        synthesize_voice(job["midi"], job["lyrics"], output_wave, job["tempo"], gender=job["gender"], work_dir=work_dir)
+        with open(output_wave, "rb") as f:
+            return f.read()
+
+
+def _worker_main(conn):
+    """
+    Boucle d'un processus du pool : midi2voice et ses dépendances (music21, pyphen) sont
+    importés une seule fois au démarrage, puis les tâches sont traitées une à une.
+    """
+    try:
+        import midi2voice.lyrics_tokenizer  # noqa: F401  (préchargement du moteur)
+        conn.send(("ready", None))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        kind, payload = message
+        if kind == "ping":
+            conn.send(("pong", os.getpid()))
+            continue
+        try:
+            conn.send(("ok", _synthesize_job(payload)))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+
+
+class _Worker:
+    """Processus du pool et son canal de communication."""
+
+    def __init__(self, context, start_timeout):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        if not self.conn.poll(start_timeout):
+            self.stop()
+            raise SynthesisError("Le processus de synthèse n'a pas démarré à temps.")
+        kind, payload = self.conn.recv()
+        if kind != "ready":
+            self.stop()
+            raise SynthesisError(f"Échec du démarrage du processus de synthèse :\n{payload}")
+
+    def request(self, message, timeout):
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise SynthesisError(f"Le processus de synthèse {self.process.pid} ne répond plus.")
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SynthesisPool:
+    """
+    Pool de processus de synthèse persistants.
+    Chaque processus charge le moteur midi2voice une seule fois, reçoit des tâches
+    (MIDI, paroles, tempo, genre) et renvoie le WAV sous forme d'octets.
+    Les processus sont recyclés après max_jobs tâches pour borner la croissance mémoire,
+    et remplacés s'ils ne répondent plus : un processus inactif depuis plus de check_interval
+    secondes est interrogé avant de recevoir une tâche.
+    """
+
+    def __init__(self, workers=2, max_jobs=50, job_timeout=600, start_timeout=120, check_interval=60,
+                 check_timeout=5):
+        """
+        :param workers: Nombre de processus de synthèse.
+        :param max_jobs: Nombre de tâches après lequel un processus est remplacé.
+        :param job_timeout: Durée maximale d'une synthèse (en secondes).
+        :param start_timeout: Durée maximale du démarrage d'un processus (en secondes).
+        :param check_interval: Durée d'inactivité après laquelle un processus est vérifié avant usage (en secondes).
+        :param check_timeout: Délai de réponse d'un processus vérifié (en secondes).
+        """
+        self.max_jobs = max_jobs
+        self.job_timeout = job_timeout
+        self.start_timeout = start_timeout
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        # "spawn" : un fork depuis un processus multi-thread peut hériter de verrous bloqués
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._closed = False
+        self.size = workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for worker in executor.map(lambda _: self._spawn(), range(workers)):
+                self._idle.put(worker)
+
+    def _spawn(self):
+        return _Worker(self._context, self.start_timeout)
+
+    def _replace(self, worker):
+        worker.stop()
+        return self._spawn()
+
+    def _check(self, worker):
+        """
+        Vérifie qu'un processus peut recevoir une tâche : un processus arrêté, ou inactif depuis
+        plus de check_interval secondes et qui ne répond pas à temps, est remplacé.
+        :return: Processus à utiliser.
+        """
+        if not worker.process.is_alive():
+            return self._replace(worker)
+        if time.monotonic() - worker.last_used < self.check_interval:
+            return worker
+        try:
+            kind, _ = worker.request(("ping", None), self.check_timeout)
+            if kind != "pong":
+                raise SynthesisError("Réponse inattendue du processus de synthèse.")
+        except (SynthesisError, OSError, EOFError):
+            return self._replace(worker)
+        worker.last_used = time.monotonic()
+        return worker
+
+    def synthesize(self, midi, lyrics, tempo, gender="male"):
+        """
+        Synthétise une voix dans un processus du pool (bloque jusqu'au résultat).
+        Peut être appelée depuis plusieurs threads à la fois.
+        :param midi: Contenu du fichier MIDI (bytes).
+        :param lyrics: Texte des paroles.
+        :param tempo: Tempo en BPM.
+        :param gender: Voix "male" ou "female".
+        :return: Contenu du fichier WAV (bytes).
+        :raises SynthesisError: En cas d'échec de la synthèse.
+        """
+        if self._closed:
+            raise SynthesisError("Le pool de synthèse est fermé.")
+        worker = self._idle.get()
+        try:
+            worker = self._check(worker)
+            job = {"midi": bytes(midi), "lyrics": lyrics, "tempo": tempo, "gender": gender}
+            try:
+                kind, payload = worker.request(("job", job), self.job_timeout)
+            except (SynthesisError, OSError, EOFError) as e:
+                worker = self._replace(worker)
+                raise SynthesisError(f"Échec de la synthèse : {e}") from e
+            worker.jobs += 1
+            worker.last_used = time.monotonic()
+            if worker.jobs >= self.max_jobs:
+                worker = self._replace(worker)
+            if kind != "ok":
+                raise SynthesisError(f"Échec de la synthèse :\n{payload}")
+            return payload
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """Arrête tous les processus du pool."""
+        self._closed = True
+        for _ in range(self.size):
+            self._idle.get().stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
@@ -0,0 +1,74 @@
+# synthesis.py
+import os
+import sys
+import subprocess
+from scratch import memory_file
+
+
+def musescore_command():
+    """Commande MuseScore utilisée par midi2voice pour convertir le MIDI en MusicXML, selon la plateforme."""
+    if sys.platform in ("win32", "cygwin"):
+        return "MuseScore3.exe"
+    if sys.platform == "darwin":
+        return "mscore"
+    return "musescore"
+
+
+def midi_to_musicxml(midi_file, musicxml_file):
+    """
+    Convertit un fichier MIDI en MusicXML avec MuseScore, sans passer par un shell
+    ni par un fichier temporaire du dossier courant.
+    """
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    subprocess.run(
+        [musescore_command(), midi_file, "-o", musicxml_file],
+        check=True, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def synthesize_voice(midi_file, lyrics, output_wave, tempo, gender="male", work_dir=None):
+    """
+    Synthétise une voix chantée avec midi2voice dans le processus courant.
+    Reprend les étapes de midi2voice.renderize_voice en imposant des chemins explicites :
+    aucun fichier n'est écrit dans le dossier courant et le WAV est écrit directement à sa place.
+    Un MIDI fourni en mémoire n'est exposé sous forme de fichier (tmpfs ou memfd, voir
+    scratch.memory_file) que le temps de la synthèse, MuseScore et midi2voice exigeant un chemin.
+
+    :param midi_file: Chemin du fichier MIDI ajusté, ou son contenu (bytes).
+    :param lyrics: Texte des paroles (une ligne par vers).
+    :param output_wave: Chemin du fichier WAV à produire.
+    :param tempo: Tempo en BPM.
+    :param gender: Voix "male" ou "female".
+    :param work_dir: Dossier des fichiers MusicXML intermédiaires (par défaut : celui de output_wave).
+    :raises ImportError: Si midi2voice n'est pas installé dans l'interpréteur courant.
+    """
+    if isinstance(midi_file, (bytes, bytearray)):
+        with memory_file(bytes(midi_file), suffix=".mid") as midi_path:
+            return synthesize_voice(midi_path, lyrics, output_wave, tempo, gender, work_dir)
+
+    from midi2voice import sinsy_request
+    from midi2voice.midi2xml import generate_voice_specification
+    from midi2voice.lyrics_tokenizer import tokenize
+
+    work_dir = work_dir or os.path.dirname(os.path.abspath(output_wave))
+    base_name = os.path.splitext(os.path.basename(output_wave))[0]
+    temp_xml = os.path.join(work_dir, f"{base_name}.temp.xml")
+    voice_xml = os.path.join(work_dir, f"{base_name}.xml")
+    try:
+        midi_to_musicxml(midi_file, temp_xml)
+        tokens = tokenize(lyrics.splitlines() or [""], midi_file)
+        generate_voice_specification(tokens, int(tempo), temp_xml, voice_xml)
+        sinsy_request(voice_xml, output_wave, gender)
+    finally:
+        for path in (temp_xml, voice_xml):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def midi2voice_available():
+    """Indique si midi2voice peut être importé dans l'interpréteur courant."""
+    try:
+        import midi2voice  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,145 @@
+# test_replicate_async.py
+import os
+import time
+import socket
+import asyncio
+import tempfile
+import unittest
+from fake_replicate_server import FakePredictionsServer
+from replicate_async import AsyncReplicateClient, PredictionError
+
+VERSION = "owner/model:1234"
+
+
+class AsyncReplicateClientTest(unittest.TestCase):
+    """Client asyncio des prédictions, testé contre le serveur local qui imite l'API Replicate."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+
+    def start_server(self, **kwargs):
+        server = FakePredictionsServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def make_jobs(self, count, params=None):
+        """Crée count fichiers d'entrée au contenu distinct : liste de tuples (input_file, output_file, params)."""
+        jobs = []
+        for index in range(count):
+            input_file = os.path.join(self.work_dir.name, f"in_{index}.wav")
+            with open(input_file, "wb") as f:
+                f.write(f"RIFF ligne {index}".encode("ascii"))
+            jobs.append((input_file, os.path.join(self.work_dir.name, f"out_{index}.wav"), dict(params or {})))
+        return jobs
+
+    def read(self, file_path):
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def test_success_downloads_every_output_in_order(self):
+        server = self.start_server(latency=0.0)
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, poll_interval=0.01)
+        jobs = self.make_jobs(3, {"pitch_change": 2})
+
+        outputs = asyncio.run(client.transform_many(VERSION, jobs))
+
+        self.assertEqual(outputs, [output_file for _, output_file, _ in jobs])
+        for input_file, output_file, _ in jobs:
+            self.assertEqual(self.read(output_file), self.read(input_file))
+
+    def test_polls_until_prediction_completes(self):
+        server = self.start_server(latency=0.3)
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, poll_interval=0.05)
+        (job,) = self.make_jobs(1)
+
+        asyncio.run(client.transform_many(VERSION, [job]))
+
+        self.assertEqual(len(server.polls), 1)
+        self.assertGreaterEqual(next(iter(server.polls.values())), 2)
+        self.assertEqual(self.read(job[1]), self.read(job[0]))
+
+    def test_failed_prediction_raises(self):
+        server = self.start_server(latency=0.05, fail_if=lambda model_input: model_input.get("f0_method") == "fail")
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, poll_interval=0.01)
+        jobs = self.make_jobs(2)
+        jobs[1][2]["f0_method"] = "fail"
+
+        with self.assertRaises(PredictionError) as context:
+            asyncio.run(client.transform_many(VERSION, jobs))
+
+        self.assertIn("failed", str(context.exception))
+        self.assertIn("Échec simulé", str(context.exception))
+        self.assertFalse(os.path.exists(jobs[1][1]))
+
+    def test_failure_cancels_predictions_in_flight(self):
+        server = self.start_server(
+            latency=5.0, fail_latency=0.1, fail_if=lambda model_input: model_input.get("f0_method") == "fail"
+        )
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, max_concurrency=3, poll_interval=0.02)
+        jobs = self.make_jobs(3)
+        jobs[0][2]["f0_method"] = "fail"
+
+        start = time.monotonic()
+        with self.assertRaises(PredictionError):
+            asyncio.run(client.transform_many(VERSION, jobs))
+
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(len(server.canceled), 2)
+
+    def test_failure_keeps_finished_jobs_and_skips_the_rest(self):
+        server = self.start_server(latency=0.05, fail_if=lambda model_input: model_input.get("f0_method") == "fail")
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, max_concurrency=1, poll_interval=0.01)
+        jobs = self.make_jobs(4)
+        jobs[1][2]["f0_method"] = "fail"
+        done = []
+
+        with self.assertRaises(PredictionError):
+            asyncio.run(client.transform_many(VERSION, jobs, on_done=done.append))
+
+        self.assertEqual(done, [0])
+        self.assertEqual(self.read(jobs[0][1]), self.read(jobs[0][0]))
+        # Les jobs suivants n'ont jamais été soumis
+        self.assertEqual(len(server.predictions), 2)
+
+    def test_stalled_connection_times_out(self):
+        # Serveur qui accepte la connexion mais ne répond jamais
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        self.addCleanup(listener.close)
+        base_url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        client = AsyncReplicateClient(token="test", base_url=base_url, request_timeout=0.2)
+
+        start = time.monotonic()
+        with self.assertRaises(OSError):
+            asyncio.run(client.transform_many(VERSION, self.make_jobs(1)))
+        self.assertLess(time.monotonic() - start, 2.0)
+
+    def test_timeout_raises(self):
+        server = self.start_server(latency=5.0)
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, poll_interval=0.01, timeout=0.1)
+
+        with self.assertRaises(PredictionError):
+            asyncio.run(client.transform_many(VERSION, self.make_jobs(1)))
+
+    def test_concurrency_is_capped(self):
+        latency = 0.2
+        server = self.start_server(latency=latency)
+        client = AsyncReplicateClient(token="test", base_url=server.base_url, max_concurrency=2, poll_interval=0.02)
+        jobs = self.make_jobs(6)
+
+        start = time.monotonic()
+        asyncio.run(client.transform_many(VERSION, jobs))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(server.max_in_flight, 2)
+        # Trois vagues de deux prédictions : plus lent que tout en parallèle, plus rapide qu'en série
+        self.assertGreaterEqual(elapsed, 3 * latency)
+        self.assertLess(elapsed, 6 * latency)
+        for input_file, output_file, _ in jobs:
+            self.assertEqual(self.read(output_file), self.read(input_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+# time_stretch.py
+import os
+import tempfile
+import numpy as np
+import soundfile as sf
+
+
+class _BlockReader:
+    """
+    Lecture par blocs d'un fichier audio ouvert avec soundfile.
+    Seule la fenêtre d'échantillons encore utile est conservée en mémoire ; les positions
+    hors du fichier (négatives ou après la fin) sont lues comme du silence.
+    """
+
+    def __init__(self, sound_file, block_frames):
+        self.file = sound_file
+        self.block_frames = block_frames
+        self.start = 0
+        self.buffer = np.zeros((0, sound_file.channels), dtype=np.float32)
+        self.eof = False
+
+    def read(self, start, length):
+        """Renvoie les trames [start, start + length) sous forme de tableau (length, canaux)."""
+        end = start + length
+        while not self.eof and self.start + len(self.buffer) < end:
+            block = self.file.read(self.block_frames, dtype="float32", always_2d=True)
+            if len(block) == 0:
+                self.eof = True
+            else:
+                self.buffer = np.concatenate((self.buffer, block))
+
+        output = np.zeros((length, self.buffer.shape[1]), dtype=np.float32)
+        low = max(start, self.start)
+        high = min(end, self.start + len(self.buffer))
+        if high > low:
+            output[low - start:high - start] = self.buffer[low - self.start:high - self.start]
+        return output
+
+    def discard(self, before):
+        """Libère les trames situées avant la position before."""
+        drop = before - self.start
+        if drop <= 0:
+            return
+        if drop < len(self.buffer):
+            self.buffer = self.buffer[drop:]
+        else:
+            # Saut au-delà des données déjà lues : inutile de décoder les trames sautées
+            self.buffer = self.buffer[:0]
+            if not self.eof:
+                self.file.seek(min(before, self.file.frames))
+        self.start = before
+
+
+def _best_offset(template, region):
+    """
+    Position dans region du segment le plus corrélé à template (corrélation croisée par FFT).
+    :return: Décalage entre 0 et len(region) - len(template).
+    """
+    span = len(region) - len(template) + 1
+    if not np.any(template):
+        return span // 2
+    size = 1 << int(len(region) + len(template) - 1).bit_length()
+    correlation = np.fft.irfft(
+        np.fft.rfft(region, size) * np.conj(np.fft.rfft(template, size)), size
+    )[:span]
+    return int(np.argmax(correlation))
+
+
+def _copy_frames(source, sink, length, block_frames):
+    """
+    Recopie les échantillons sans traitement, tronqués ou complétés par du silence
+    pour atteindre length trames (lecture en int16 : un fichier 16 bits est recopié à l'identique).
+    """
+    written = 0
+    for block in source.blocks(blocksize=block_frames, dtype="int16", always_2d=True):
+        block = block[:length - written]
+        sink.write(block)
+        written += len(block)
+        if written >= length:
+            break
+    if written < length:
+        sink.write(np.zeros((length - written, source.channels), dtype=np.int16))
+
+
+def time_stretch(input_file, output_file, ratio, frame_ms=40, tolerance_ms=10, block_frames=65536):
+    """
+    Étire ou compresse un fichier audio dans le temps sans modifier sa hauteur (WSOLA).
+    Les trames d'analyse sont lues par blocs et chaque trame de sortie est écrite dès qu'elle
+    est complète : la mémoire utilisée ne dépend pas de la durée du fichier. Tous les canaux
+    sont traités ensemble ; l'alignement des trames est calculé sur le mixage mono.
+    Le fichier de sortie peut être le fichier d'entrée. Si la durée change de moins d'un pas de
+    synthèse (rapport ≈ 1), les échantillons sont recopiés tels quels au lieu d'être recollés.
+
+    :param input_file: Chemin du fichier audio d'entrée.
+    :param output_file: Chemin du fichier WAV de sortie (PCM 16 bits).
+    :param ratio: Rapport durée de sortie / durée d'entrée (> 1 : ralenti, < 1 : accéléré).
+    :param frame_ms: Longueur des trames de synthèse en millisecondes.
+    :param tolerance_ms: Décalage maximal des trames d'analyse pour l'alignement, en millisecondes.
+    :param block_frames: Nombre de trames lues à la fois dans le fichier d'entrée.
+    :return: Tuple (nombre de trames écrites, fréquence d'échantillonnage, nombre de canaux).
+    """
+    if ratio <= 0:
+        raise ValueError(f"Rapport d'étirement invalide : {ratio}")
+
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    fd, temp_file = tempfile.mkstemp(suffix=".wav", dir=output_dir)
+    os.close(fd)
+    try:
+        with sf.SoundFile(input_file) as source:
+            sample_rate, channels = source.samplerate, source.channels
+            new_length = int(source.frames * ratio)
+
+            frame_length = max(4, int(sample_rate * frame_ms / 1000) // 2 * 2)
+            hop_out = frame_length // 2
+            hop_in = hop_out / ratio
+            tolerance = max(1, int(sample_rate * tolerance_ms / 1000))
+            # Fenêtre de Hann périodique : avec un recouvrement de 50 %, la somme des fenêtres vaut 1
+            window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)).astype(np.float32)
+            window = window[:, None]
+
+            reader = _BlockReader(source, block_frames)
+            accumulator = np.zeros((frame_length, channels), dtype=np.float32)
+            # La trame k est centrée sur k * hop_in en entrée et sur k * hop_out en sortie
+            skip = hop_out
+            written = 0
+            previous = None
+
+            with sf.SoundFile(temp_file, "w", sample_rate, channels, subtype="PCM_16", format="WAV") as sink:
+                if abs(new_length - source.frames) <= hop_out:
+                    _copy_frames(source, sink, new_length, block_frames)
+                    written = new_length
+                frame_index = 0
+                while written < new_length:
+                    nominal = int(round(frame_index * hop_in)) - hop_out
+                    if previous is None:
+                        position = nominal
+                    else:
+                        # Suite naturelle de la trame précédente, comparée aux positions candidates
+                        template = reader.read(previous + hop_out, frame_length).mean(axis=1)
+                        region = reader.read(nominal - tolerance, frame_length + 2 * tolerance).mean(axis=1)
+                        position = nominal - tolerance + _best_offset(template, region)
+
+                    accumulator += reader.read(position, frame_length) * window
+                    previous = position
+                    next_nominal = int(round((frame_index + 1) * hop_in)) - hop_out
+                    reader.discard(min(position + hop_out, next_nominal - tolerance))
+
+                    ready = accumulator[skip:hop_out]
+                    ready = ready[:new_length - written]
+                    if len(ready):
+                        sink.write(ready)
+                        written += len(ready)
+                    skip = max(0, skip - hop_out)
+                    accumulator[:-hop_out] = accumulator[hop_out:]
+                    accumulator[-hop_out:] = 0
+                    frame_index += 1
+
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+    return new_length, sample_rate, channels
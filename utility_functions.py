@@ -1,17 +1,16 @@
 # utility_functions
 import os
-from tqdm import tqdm
-from mido import MidiFile, MidiTrack
-from pydub import AudioSegment
-from pydub.silence import detect_nonsilent
-import syllapy
-from mido import MidiFile, MidiTrack, Message
-import cv2
+import io
 import numpy as np
-import soundfile as sf
-import librosa
 import logging
 import wave
+import struct
+from collections import namedtuple
+from syllables import analyze_line, count_syllables, normalize_word
+from rhythm import quantize_durations, rebalance_measures
+
+# Les modules lents à importer (pydub, librosa, soundfile, mido, tqdm) sont importés dans les
+# fonctions qui les utilisent : un lancement du CLI ne paie que ceux de son chemin d'exécution.
 
 def console_logger(message):
     """
@@ -51,6 +50,8 @@ def green_tqdm(iterable, desc="Progression"):
     :param desc: Description de la barre.
     :return: Barre de progression.
     """
+    from tqdm import tqdm
+
     green_color = "\033[92m"  # Code ANSI pour le vert vif
     reset_color = "\033[0m"
     return tqdm(
@@ -82,6 +83,8 @@ def clean_temporary_files(files):
 def clean_all_temporary_files(num_lines, extra_files=None):
     """
     Supprime tous les fichiers temporaires liés au traitement des lignes.
+    Ancien mécanisme basé sur des noms de fichiers devinés dans le dossier courant :
+    le pipeline utilise désormais des dossiers de travail (voir scratch.ScratchDirectory).
     
     :param num_lines: Nombre de lignes à traiter, utilisé pour générer les noms de fichiers temporaires.
     """
@@ -121,17 +124,23 @@ def add_silence_to_midi(input_file, output_file, target_duration):
     :param output_file: Chemin du fichier MIDI de sortie.
     :param target_duration: Durée cible en secondes.
     """
+    from mido import MidiFile, MidiTrack
+    from song_map import TempoMap
+
     midi = MidiFile(input_file)
     ticks_per_beat = midi.ticks_per_beat
 
-    current_duration = sum(msg.time for msg in midi.tracks[0])
-    tempo = 80  # Par défaut, 120 BPM
+    # Carte des tempos construite en une passe (tous les changements, pas seulement le dernier)
+    current_duration = 0
+    tempo_changes = []
     for msg in midi.tracks[0]:
+        current_duration += msg.time
         if msg.type == 'set_tempo':
-            tempo = msg.tempo
+            tempo_changes.append((current_duration, msg.tempo))
+    tempo_map = TempoMap(ticks_per_beat, tempo_changes)
 
-    seconds_per_tick = (tempo / 1_000_000) / ticks_per_beat
-    current_duration_seconds = current_duration * seconds_per_tick
+    seconds_per_tick = (tempo_map.tempo_at(current_duration) / 1_000_000) / ticks_per_beat
+    current_duration_seconds = tempo_map.seconds(current_duration)
 
     silence_needed = target_duration - current_duration_seconds
     if silence_needed > 0:
@@ -144,33 +153,199 @@ def add_silence_to_midi(input_file, output_file, target_duration):
 def validate_syllables(verse):
     """
     Valide le nombre de syllabes dans un vers.
+    Pour un fichier de paroles complet, préférer syllables.analyze_lyrics (un seul appel).
     
     :param verse: Texte du vers.
-    :return: Analyse des syllabes (fictive pour le moment).
+    :return: Liste de tuples (mot, nombre de syllabes).
     """
-    # Simulation d'une analyse (peut être remplacé par une vraie analyse)
-    return [("word", len(word)) for word in verse.split()]
+    return analyze_line(verse).pairs()
+
+class WavInfo(namedtuple("WavInfo", ["frames", "sample_rate", "channels", "sample_width"])):
+    """Métadonnées d'un fichier WAV : nombre de trames, fréquence, canaux et taille d'échantillon (octets)."""
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        """Durée en secondes."""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+def probe_wav(file_path):
+    """
+    Lit uniquement l'en-tête RIFF d'un fichier WAV (chunks "fmt " et "data"), sans décoder l'audio.
+    Accepte le PCM entier, le flottant et WAVE_FORMAT_EXTENSIBLE.
+
+    :param file_path: Chemin du fichier WAV.
+    :return: WavInfo du fichier.
+    :raises ValueError: Si le fichier n'est pas un WAV RIFF valide.
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"Fichier WAV invalide : {file_path}")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"Chunk 'data' introuvable : {file_path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                _, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", f.read(16))
+                fmt = (channels, sample_rate, block_align, bits)
+                f.seek(chunk_size - 16 + (chunk_size & 1), os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"Chunk 'fmt ' manquant avant les données : {file_path}")
+                channels, sample_rate, block_align, bits = fmt
+                # Taille bornée par celle du fichier (en-têtes non finalisés ou tronqués)
+                data_size = min(chunk_size, file_size - f.tell())
+                frames = data_size // block_align if block_align else 0
+                return WavInfo(frames, sample_rate, channels, (bits + 7) // 8)
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
 
 def get_audio_duration(file_path):
     """
     Calcule la durée d'un fichier audio en secondes.
+    Pour un WAV, seule l'en-tête est lue ; les autres formats sont décodés avec pydub.
 
     :param file_path: Chemin du fichier audio.
     :return: Durée en secondes.
     """
-    audio = AudioSegment.from_file(file_path, format="wav")
-    return len(audio) / 1000.0  # La durée est en millisecondes, donc division par 1000
+    try:
+        return probe_wav(file_path).duration
+    except (ValueError, struct.error):
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(file_path)
+        return len(audio) / 1000.0  # La durée est en millisecondes, donc division par 1000
+
+def read_pcm_samples(raw_data, sample_width):
+    """
+    Décode des données PCM entrelacées en tableau NumPy d'entiers signés.
+
+    :param raw_data: Données brutes (bytes).
+    :param sample_width: Taille d'un échantillon en octets (1, 2, 3 ou 4).
+    :return: Tableau int32 des échantillons.
+    """
+    if sample_width == 1:
+        return np.frombuffer(raw_data, dtype=np.uint8).astype(np.int32) - 128
+    if sample_width == 2:
+        return np.frombuffer(raw_data, dtype="<i2").astype(np.int32)
+    if sample_width == 3:
+        packed = np.frombuffer(raw_data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        return np.where(values >= 1 << 23, values - (1 << 24), values)
+    if sample_width == 4:
+        return np.frombuffer(raw_data, dtype="<i4").astype(np.int32)
+    raise ValueError(f"Taille d'échantillon non prise en charge : {sample_width}")
+
+def find_nonsilent_bounds(samples, channels, sample_rate, sample_width, silence_threshold=-40, chunk_size=10):
+    """
+    Trouve le début et la fin de la partie non silencieuse d'un signal, avec la même sémantique que
+    pydub.silence.detect_nonsilent (fenêtres de chunk_size ms glissant par pas de 1 ms, RMS entier
+    comparé au seuil), mais calculée en une passe vectorisée à partir d'une somme cumulée des carrés.
+
+    :param samples: Échantillons entrelacés (tableau d'entiers).
+    :param channels: Nombre de canaux.
+    :param sample_rate: Fréquence d'échantillonnage.
+    :param sample_width: Taille d'un échantillon en octets.
+    :param silence_threshold: Seuil de silence en dBFS.
+    :param chunk_size: Taille des fenêtres analysées en millisecondes.
+    :return: Tuple (début, fin) en millisecondes, ou None si tout le signal est silencieux.
+    """
+    frame_count = len(samples) // channels
+    length_ms = int(round(1000 * frame_count / sample_rate))
+    if length_ms < chunk_size:
+        # Signal plus court qu'une fenêtre : pydub ne détecte aucun silence et garde tout
+        return 0, length_ms
+
+    # Même conversion ms -> trames que le découpage de pydub
+    starts_ms = np.arange(0, length_ms - chunk_size + 1)
+    start_frames = np.minimum((starts_ms * sample_rate / 1000.0).astype(np.int64), frame_count)
+    end_frames = np.minimum(((starts_ms + chunk_size) * sample_rate / 1000.0).astype(np.int64), frame_count)
+
+    energy = (samples.astype(np.int64) ** 2).reshape(frame_count, channels).sum(axis=1)
+    cumulative = np.concatenate(([0], np.cumsum(energy)))
+    counts = np.maximum((end_frames - start_frames) * channels, 1)
+    rms = np.floor(np.sqrt((cumulative[end_frames] - cumulative[start_frames]) / counts))
+
+    threshold = (10 ** (silence_threshold / 20.0)) * (2 ** (sample_width * 8) / 2)
+    silent_starts = starts_ms[rms <= threshold]
+    if len(silent_starts) == 0:
+        return 0, length_ms
+
+    # Plages de silence : fenêtres silencieuses consécutives, fusionnées comme dans pydub
+    breaks = np.nonzero(np.diff(silent_starts) > chunk_size)[0]
+    range_starts = np.concatenate(([silent_starts[0]], silent_starts[breaks + 1]))
+    range_ends = np.concatenate((silent_starts[breaks], [silent_starts[-1]])) + chunk_size
+
+    if range_starts[0] == 0 and range_ends[0] == length_ms:
+        return None
+    start = int(range_ends[0]) if range_starts[0] == 0 else 0
+    end = int(range_starts[-1]) if range_ends[-1] == length_ms else length_ms
+    return start, end
 
 def remove_silence(input_file, output_file, silence_threshold=-40, chunk_size=10, padding_ms=250):
     """
     Supprime les silences dans un fichier audio.
+    Version NumPy : l'enveloppe RMS est calculée en une passe vectorisée et les données PCM
+    sont recopiées sans décodage complet. Les fichiers que le module wave ne sait pas lire
+    sont traités par remove_silence_pydub.
     
     :param input_file: Chemin du fichier audio d'entrée.
     :param output_file: Chemin du fichier audio de sortie.
     :param silence_threshold: Seuil de silence en dBFS.
     :param chunk_size: Taille des segments analysés en millisecondes.
     :param padding_ms: Durée du silence ajouté avant et après (en millisecondes).
+    :return: WavInfo du fichier produit, ou None si aucun son n'a été détecté.
     """
+    try:
+        with wave.open(input_file, "rb") as wav_in:
+            params = wav_in.getparams()
+            raw_data = wav_in.readframes(params.nframes)
+    except wave.Error:
+        return remove_silence_pydub(input_file, output_file, silence_threshold, chunk_size, padding_ms)
+
+    channels, sample_width, sample_rate = params.nchannels, params.sampwidth, params.framerate
+    samples = read_pcm_samples(raw_data, sample_width)
+    bounds = find_nonsilent_bounds(samples, channels, sample_rate, sample_width, silence_threshold, chunk_size)
+
+    if bounds:
+        frame_width = channels * sample_width
+        frame_count = len(raw_data) // frame_width
+        start_frame = min(int(bounds[0] * sample_rate / 1000.0), frame_count)
+        end_frame = min(int(bounds[1] * sample_rate / 1000.0), frame_count)
+        silence_byte = b"\x80" if sample_width == 1 else b"\x00"
+        padding_frames = int(padding_ms * sample_rate / 1000.0)
+        silence = silence_byte * (padding_frames * frame_width)
+
+        with wave.open(output_file, "wb") as wav_out:
+            wav_out.setnchannels(channels)
+            wav_out.setsampwidth(sample_width)
+            wav_out.setframerate(sample_rate)
+            wav_out.writeframes(silence)
+            wav_out.writeframes(raw_data[start_frame * frame_width:end_frame * frame_width])
+            wav_out.writeframes(silence)
+        print_format_message(f"Silences supprimés : {input_file} -> {output_file}", "INFO")
+        return WavInfo(end_frame - start_frame + 2 * padding_frames, sample_rate, channels, sample_width)
+    print_format_message(f"Aucun son détecté dans : {input_file}. Fichier inchangé.", "ERREUR")
+    return None
+
+def remove_silence_pydub(input_file, output_file, silence_threshold=-40, chunk_size=10, padding_ms=250):
+    """
+    Supprime les silences dans un fichier audio avec pydub (implémentation d'origine, plus lente).
+    
+    :param input_file: Chemin du fichier audio d'entrée.
+    :param output_file: Chemin du fichier audio de sortie.
+    :param silence_threshold: Seuil de silence en dBFS.
+    :param chunk_size: Taille des segments analysés en millisecondes.
+    :param padding_ms: Durée du silence ajouté avant et après (en millisecondes).
+    :return: WavInfo du fichier produit, ou None si aucun son n'a été détecté.
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_nonsilent
+
     audio = AudioSegment.from_file(input_file, format="wav")
     nonsilent_ranges = detect_nonsilent(audio, min_silence_len=chunk_size, silence_thresh=silence_threshold)
 
@@ -181,8 +356,12 @@ def remove_silence(input_file, output_file, silence_threshold=-40, chunk_size=10
         trimmed_audio_with_padding = silence + trimmed_audio + silence
         trimmed_audio_with_padding.export(output_file, format="wav")
         print_format_message(f"Silences supprimés : {input_file} -> {output_file}", "INFO")
-    else:
-        print_format_message(f"Aucun son détecté dans : {input_file}. Fichier inchangé.", "ERREUR")
+        return WavInfo(
+            int(trimmed_audio_with_padding.frame_count()), trimmed_audio_with_padding.frame_rate,
+            trimmed_audio_with_padding.channels, trimmed_audio_with_padding.sample_width
+        )
+    print_format_message(f"Aucun son détecté dans : {input_file}. Fichier inchangé.", "ERREUR")
+    return None
         
 def format_message(message, status="INFO"):
     """
@@ -210,6 +389,9 @@ def adjust_audio_bpm(input_file, output_file, old_bpm, new_bpm):
     :param old_bpm: BPM actuel.
     :param new_bpm: BPM cible.
     """
+    import librosa
+    import soundfile as sf
+
     # Charger l'audio
     y, sr = librosa.load(input_file, sr=None)
 
@@ -235,21 +417,14 @@ def adjust_syllables_to_midi(syllables, beats_per_measure=4, total_duration=3.0)
     """
     num_syllables = len(syllables)
     time_per_beat = total_duration / beats_per_measure  # Durée d'un temps en secondes
-    durations = [time_per_beat / num_syllables] * num_syllables  # Répartition égale
-    
-    # Ajuster pour respecter les contraintes musicales (durées classiques)
-    music_temps = [4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25]  # Durées possibles
-    adjusted_durations = []
+    durations = np.full(num_syllables, time_per_beat / num_syllables)  # Répartition égale
 
-    for duration in durations:
-        closest_duration = min(music_temps, key=lambda x: abs(x - duration))
-        adjusted_durations.append(closest_duration)
+    # Ajuster pour respecter les contraintes musicales (durées classiques les plus proches)
+    adjusted_durations = quantize_durations(durations, (4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25), nearest=True)
 
     # Réajuster la somme pour être exactement égale à 4 temps
-    scaling_factor = beats_per_measure / sum(adjusted_durations)
-    adjusted_durations = [d * scaling_factor for d in adjusted_durations]
-
-    return adjusted_durations
+    scaling_factor = beats_per_measure / adjusted_durations.sum()
+    return (adjusted_durations * scaling_factor).tolist()
 
 def adjust_midi_with_syllables(midi_file, syllables, output_file):
     """
@@ -259,6 +434,8 @@ def adjust_midi_with_syllables(midi_file, syllables, output_file):
     :param syllables: Liste des syllabes (utilisée pour ajuster les durées).
     :param output_file: Chemin du fichier MIDI ajusté à générer.
     """
+    from mido import MidiFile, MidiTrack, Message
+
     midi = MidiFile(midi_file)
     ticks_per_beat = midi.ticks_per_beat
 
@@ -294,6 +471,8 @@ def add_note_variation(midi_file, adjusted_durations):
     :param adjusted_durations: Liste des durées ajustées (en secondes ou ticks MIDI).
     :return: Liste des hauteurs ajustées des notes.
     """
+    from mido import MidiFile
+
     midi = MidiFile(midi_file)
     
     # Extraire les hauteurs des notes originales
@@ -323,6 +502,8 @@ def create_midi_with_variations(input_midi_file, adjusted_notes, adjusted_durati
     :param adjusted_durations: Liste des durées des notes (en ticks MIDI).
     :param output_midi_file: Chemin du fichier MIDI de sortie.
     """
+    from mido import MidiFile, MidiTrack, Message
+
     if len(adjusted_notes) != len(adjusted_durations):
         raise ValueError("La longueur des notes ajustées ne correspond pas aux durées ajustées.")
 
@@ -350,23 +531,9 @@ def match_durations_to_music(durations, beats_per_measure=4):
     :param beats_per_measure: Nombre de temps par mesure (par défaut 4).
     :return: Liste des durées musicales ajustées.
     """
-    # Liste des durées musicales possibles (en fractions de 4 temps)
-    music_temps = [6.0, 4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25, 0.125, 0.0625]
-
-    adjusted_durations = []
-
-    for duration in durations:
-        # Trouver la durée musicale la plus proche ou légèrement supérieure
-        closest_duration = min(music_temps, key=lambda x: (x >= duration, abs(x - duration)))
-        adjusted_durations.append(closest_duration)
-
-    # Ajuster pour que la somme soit exactement égale à la mesure (4 temps)
-    total_duration = sum(adjusted_durations)
-    if total_duration != beats_per_measure:
-        # Ajuster la dernière durée pour compenser la différence
-        adjusted_durations[-1] += beats_per_measure - total_duration
-
-    return adjusted_durations
+    # Durées musicales possibles (voir rhythm.MUSIC_TEMPS), puis correction de la dernière durée
+    adjusted_durations = quantize_durations(durations)
+    return rebalance_measures(adjusted_durations, [0, len(adjusted_durations)], beats_per_measure).tolist()
 
 def analyze_verse(verse):
     """
@@ -374,7 +541,7 @@ def analyze_verse(verse):
     :param verse: Texte du vers.
     :return: Liste de tuples (mot, nombre de syllabes).
     """
-    return [(word, syllapy.count(word)) for word in verse.split()]
+    return [(word, count_syllables(normalize_word(word))) for word in verse.split()]
 
 
 def map_syllables_to_durations(syllable_count, beats_per_measure=4):
@@ -396,19 +563,8 @@ def adjust_durations(durations, beats_per_measure=4):
     :param beats_per_measure: Nombre de temps par mesure.
     :return: Liste des durées musicales ajustées.
     """
-    music_temps = [6.0, 4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25, 0.125]
-    adjusted_durations = []
-
-    for duration in durations:
-        closest_duration = min(music_temps, key=lambda x: (x >= duration, abs(x - duration)))
-        adjusted_durations.append(closest_duration)
-
-    # Ajuster la somme pour correspondre exactement à 4 temps
-    total_duration = sum(adjusted_durations)
-    if total_duration != beats_per_measure:
-        adjusted_durations[-1] += beats_per_measure - total_duration
-
-    return adjusted_durations
+    adjusted_durations = quantize_durations(durations, (6.0, 4.0, 3.0, 2.0, 1.5, 1.0, 0.5, 0.33, 0.25, 0.125))
+    return rebalance_measures(adjusted_durations, [0, len(adjusted_durations)], beats_per_measure).tolist()
 
 def adjust_midi(midi_file, durations, output_file):
     """
@@ -419,6 +575,8 @@ def adjust_midi(midi_file, durations, output_file):
     :param durations: Liste des durées ajustées.
     :param output_file: Chemin du fichier MIDI ajusté à générer.
     """
+    from mido import MidiFile, MidiTrack, Message
+
     midi = MidiFile(midi_file)
     ticks_per_beat = midi.ticks_per_beat
     new_track = MidiTrack()
@@ -475,35 +633,33 @@ def add_stress_to_durations(durations, stressed_syllables):
 
 def adjust_audio_duration(input_file, output_file, target_duration):
     """
-    Ajuste la durée d'un fichier audio à l'aide d'OpenCV en redimensionnant les données audio.
+    Ajuste la durée d'un fichier audio par étirement temporel (WSOLA), sans modifier la hauteur.
+    Le fichier est traité par blocs : la mémoire utilisée ne dépend pas de sa durée.
 
     :param input_file: Chemin du fichier audio d'entrée.
-    :param output_file: Chemin du fichier audio de sortie.
+    :param output_file: Chemin du fichier audio de sortie (peut être le fichier d'entrée).
     :param target_duration: Durée cible en secondes.
+    :return: WavInfo du fichier produit.
     """
-    # Charger l'audio avec soundfile
-    data, sample_rate = sf.read(input_file)
-    current_duration = len(data) / sample_rate
-
-    # Calcul du ratio de redimensionnement
-    resize_ratio = target_duration / current_duration
-    new_length = int(len(data) * resize_ratio)
-
-    # Si stéréo, traiter les deux canaux
-    if len(data.shape) > 1:  # Stéréo
-        resized_data = np.zeros((new_length, data.shape[1]))
-        for channel in range(data.shape[1]):
-            resized_data[:, channel] = cv2.resize(
-                data[:, channel], (1, new_length), interpolation=cv2.INTER_LINEAR
-            ).flatten()
-    else:  # Mono
-        resized_data = cv2.resize(
-            data, (1, new_length), interpolation=cv2.INTER_LINEAR
-        ).flatten()
-
-    # Exporter l'audio ajusté
-    sf.write(output_file, resized_data, sample_rate)
+    import soundfile as sf
+    from time_stretch import time_stretch
+
+    info = sf.info(input_file)
+    current_duration = info.frames / info.samplerate
+    if current_duration <= 0:
+        raise ValueError(f"Impossible d'ajuster la durée d'un fichier audio vide : {input_file}")
+
+    # Fichier déjà à la bonne durée (cas de la sortie RVC) : rien à réécrire
+    if (
+        os.path.abspath(input_file) == os.path.abspath(output_file)
+        and info.frames == int(info.frames * target_duration / current_duration)
+        and info.format == "WAV" and info.subtype == "PCM_16"
+    ):
+        return WavInfo(info.frames, info.samplerate, info.channels, 2)
+
+    frames, sample_rate, channels = time_stretch(input_file, output_file, target_duration / current_duration)
     print(format_message(f"Audio ajusté exporté vers : {output_file}", "RÉUSSI"))
+    return WavInfo(frames, sample_rate, channels, 2)
 
 def convert_to_uniform_format(input_file, output_file, channels=2, sample_rate=44100):
     """
@@ -514,6 +670,8 @@ def convert_to_uniform_format(input_file, output_file, channels=2, sample_rate=4
     :param channels: Nombre de canaux (1=mono, 2=stéréo).
     :param sample_rate: Taux d'échantillonnage cible.
     """
+    from pydub import AudioSegment
+
     audio = AudioSegment.from_file(input_file)
     audio = audio.set_frame_rate(sample_rate).set_channels(channels)
     audio.export(output_file, format="wav")
@@ -548,4 +706,181 @@ def concatenate_audio(output_file, all_wave_files):
     except Exception as e:
         raise ValueError(f"Erreur lors de la concaténation des fichiers audio : {e}")
 
+def mix_channels(block, channels):
+    """
+    Adapte le nombre de canaux d'un bloc (trames, canaux) : duplication d'un signal mono,
+    moyenne vers le mono, ou passage par le mono pour les autres combinaisons.
+    """
+    if block.shape[1] == channels:
+        return block
+    if block.shape[1] == 1:
+        return np.repeat(block, channels, axis=1)
+    mono = block.mean(axis=1, keepdims=True)
+    return mono if channels == 1 else np.repeat(mono, channels, axis=1)
+
+class LinearResampler:
+    """
+    Rééchantillonnage linéaire par blocs, sans dérive : la position de chaque trame de sortie
+    est calculée en arithmétique entière, et la dernière trame du bloc précédent est conservée
+    pour interpoler à la jonction entre deux blocs.
+    """
+
+    def __init__(self, input_rate, output_rate, total_input_frames):
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.total_output_frames = int(round(total_input_frames * output_rate / input_rate))
+        self.next_output = 0
+        self.consumed = 0
+        self.previous = None
+
+    def process(self, block, last=False):
+        """
+        :param block: Trames d'entrée suivantes (tableau float trames x canaux).
+        :param last: Indique le dernier bloc du fichier.
+        :return: Trames de sortie calculables avec les données reçues.
+        """
+        if self.previous is not None:
+            block = np.concatenate((self.previous, block))
+            base = self.consumed - 1
+        else:
+            base = self.consumed
+        self.consumed = base + len(block)
+        if len(block) == 0:
+            return block
+
+        if last:
+            end = self.total_output_frames
+        else:
+            # Sorties dont les deux trames d'interpolation sont disponibles
+            end = min(((self.consumed - 1) * self.output_rate) // self.input_rate + 1, self.total_output_frames)
+        outputs = np.arange(self.next_output, max(end, self.next_output), dtype=np.int64)
+        self.next_output = max(end, self.next_output)
+        self.previous = block[-1:]
+
+        # Positions absolues : l'erreur d'arrondi ne s'accumule pas d'un bloc à l'autre
+        position = outputs * (self.input_rate / self.output_rate) - base
+        low = np.minimum(position.astype(np.int64), len(block) - 1)
+        fraction = (position - low).astype(np.float32)[:, None]
+        high = np.minimum(low + 1, len(block) - 1)
+        return block[low] + (block[high] - block[low]) * fraction
+
+def read_uniform_blocks(source, channels=2, sample_rate=44100, block_frames=65536):
+    """
+    Lit un fichier ou tampon audio par blocs, convertis à la volée en PCM 16 bits au format demandé.
+    Les blocs déjà au bon format sont renvoyés sans modification.
+
+    :param source: Chemin, contenu WAV (bytes) ou objet fichier.
+    :param channels: Nombre de canaux de sortie.
+    :param sample_rate: Fréquence d'échantillonnage de sortie.
+    :param block_frames: Nombre de trames lues à la fois.
+    :return: Générateur de tableaux int16 (trames, canaux).
+    """
+    import soundfile as sf
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with sf.SoundFile(source) as sound_file:
+        resampler = None
+        if sound_file.samplerate != sample_rate:
+            resampler = LinearResampler(sound_file.samplerate, sample_rate, sound_file.frames)
+        while True:
+            block = sound_file.read(block_frames, dtype="int16", always_2d=True)
+            last = len(block) < block_frames
+            if resampler is None and block.shape[1] == channels:
+                yield block
+            else:
+                converted = block.astype(np.float32)
+                # Le remixage est fait du côté où il y a le moins de canaux
+                if block.shape[1] > channels:
+                    converted = mix_channels(converted, channels)
+                if resampler:
+                    converted = resampler.process(converted, last)
+                converted = mix_channels(converted, channels)
+                yield np.clip(np.round(converted), -32768, 32767).astype(np.int16)
+            if last:
+                break
+
+def assemble_audio(output_file, inputs, channels=2, sample_rate=44100, block_frames=65536):
+    """
+    Assemble plusieurs fichiers ou tampons audio en un seul WAV 16 bits au format uniforme,
+    en une passe : chaque bloc lu est rééchantillonné et remixé à la volée puis écrit directement,
+    sans fichier intermédiaire. Remplace convert_to_uniform_format suivi de concatenate_audio.
 
+    :param output_file: Chemin du fichier de sortie.
+    :param inputs: Liste de chemins, de contenus WAV (bytes) ou d'objets fichier.
+    :param channels: Nombre de canaux de sortie.
+    :param sample_rate: Fréquence d'échantillonnage de sortie.
+    :param block_frames: Nombre de trames lues à la fois.
+    :return: WavInfo du fichier produit.
+    """
+    total_frames = 0
+    try:
+        with wave.open(output_file, "wb") as wav_out:
+            wav_out.setnchannels(channels)
+            wav_out.setsampwidth(2)
+            wav_out.setframerate(sample_rate)
+            for source in inputs:
+                for samples in read_uniform_blocks(source, channels, sample_rate, block_frames):
+                    wav_out.writeframes(np.ascontiguousarray(samples, dtype="<i2").tobytes())
+                    total_frames += len(samples)
+        print(format_message(f"Audio final assemblé : {output_file}", "RÉUSSI"))
+    except Exception as e:
+        raise ValueError(f"Erreur lors de l'assemblage des fichiers audio : {e}")
+    return WavInfo(total_frames, sample_rate, channels, 2)
+
+def stitch_audio(input_files, output_file, gap_seconds=0.5):
+    """
+    Assemble plusieurs fichiers audio de même format dans un seul fichier, séparés par un silence,
+    en mémorisant la position de chacun pour pouvoir le redécouper ensuite (voir split_audio).
+
+    :param input_files: Liste des fichiers audio à assembler.
+    :param output_file: Chemin du fichier assemblé.
+    :param gap_seconds: Silence inséré entre deux fichiers, pour limiter les débordements aux frontières.
+    :return: Tuple (liste des (début, nombre d'échantillons) de chaque fichier, nombre total d'échantillons).
+    """
+    import soundfile as sf
+
+    segments = []
+    position = 0
+    with sf.SoundFile(input_files[0]) as first:
+        sample_rate, channels = first.samplerate, first.channels
+    gap = np.zeros((int(gap_seconds * sample_rate), channels))
+
+    with sf.SoundFile(output_file, "w", samplerate=sample_rate, channels=channels, subtype="PCM_16") as out:
+        for i, input_file in enumerate(input_files):
+            data, rate = sf.read(input_file, always_2d=True)
+            if rate != sample_rate or data.shape[1] != channels:
+                raise ValueError(
+                    f"Les propriétés audio du fichier {input_file} ne correspondent pas : "
+                    f"canaux={data.shape[1]}, fréquence={rate}"
+                )
+            if i > 0:
+                out.write(gap)
+                position += len(gap)
+            out.write(data)
+            segments.append((position, len(data)))
+            position += len(data)
+
+    print(format_message(f"{len(input_files)} fichiers assemblés : {output_file}", "INFO"))
+    return segments, position
+
+def split_audio(input_file, segments, total_frames, output_files):
+    """
+    Redécoupe un fichier produit à partir de stitch_audio (éventuellement rééchantillonné
+    entre-temps) selon les positions mémorisées.
+
+    :param input_file: Fichier audio à découper.
+    :param segments: Liste des (début, nombre d'échantillons) renvoyée par stitch_audio.
+    :param total_frames: Nombre total d'échantillons du fichier assemblé d'origine.
+    :param output_files: Chemins des fichiers de sortie, un par segment.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(input_file) as source:
+        # Les positions sont mises à l'échelle si la sortie n'a plus la même longueur
+        ratio = source.frames / total_frames
+        for (start, length), output_file in zip(segments, output_files):
+            source.seek(int(round(start * ratio)))
+            data = source.read(int(round(length * ratio)), always_2d=True)
+            sf.write(output_file, data, source.samplerate)
+    print(format_message(f"{len(output_files)} segments extraits de : {input_file}", "INFO"))
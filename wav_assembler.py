@@ -0,0 +1,135 @@
+# wav_assembler.py
+import os
+import mmap
+import struct
+import uuid
+import threading
+import numpy as np
+from utility_functions import read_uniform_blocks, WavInfo, format_message
+
+WAV_HEADER_SIZE = 44
+MAX_DATA_SIZE = 0xFFFFFFFF - (WAV_HEADER_SIZE - 8)
+
+
+def wav_header(frames, channels, sample_rate, sample_width=2):
+    """En-tête RIFF/WAVE PCM minimal (44 octets) pour le nombre de trames donné."""
+    block_align = channels * sample_width
+    data_size = frames * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", WAV_HEADER_SIZE - 8 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+class WavAssembler:
+    """
+    Fichier WAV final préalloué et projeté en mémoire.
+    La place de chaque ligne est connue d'avance grâce aux durées cibles : chaque ligne peut donc
+    être écrite à son emplacement dès qu'elle est prête, dans n'importe quel ordre, sans garder
+    les autres lignes en mémoire. Une ligne plus courte que sa place est complétée par du silence,
+    une ligne plus longue est tronquée.
+    Le fichier est assemblé dans un fichier temporaire du même dossier, qui ne remplace
+    output_file qu'à la fermeture, si toutes les lignes ont été écrites : un pipeline interrompu
+    ou annulé laisse intact le fichier final précédent.
+    """
+
+    def __init__(self, output_file, durations, channels=2, sample_rate=44100):
+        """
+        :param output_file: Chemin du fichier WAV final.
+        :param durations: Durées cibles des lignes, en secondes, dans l'ordre du morceau.
+        :param channels: Nombre de canaux du fichier final.
+        :param sample_rate: Fréquence d'échantillonnage du fichier final.
+        """
+        self.output_file = output_file
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.slots = []
+        offset = 0
+        for duration in durations:
+            frames = int(round(duration * sample_rate))
+            self.slots.append((offset, frames))
+            offset += frames
+        self.frames = offset
+        self.written = set()
+        self._lock = threading.Lock()
+
+        data_size = self.frames * channels * 2
+        if data_size > MAX_DATA_SIZE:
+            raise ValueError(f"Fichier final trop volumineux pour le format WAV : {data_size} octets")
+
+        # Fichier préalloué : les données non encore écrites sont lues comme du silence
+        # (nom unique créé avec open plutôt que mkstemp, pour garder les permissions habituelles)
+        self.temp_file = f"{output_file}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self.temp_file, "x+b")
+        try:
+            self._file.write(wav_header(self.frames, channels, sample_rate))
+            self._file.truncate(WAV_HEADER_SIZE + data_size)
+            self._mmap = None
+            self._samples = np.zeros((0, channels), dtype="<i2")
+            if data_size:
+                self._mmap = mmap.mmap(self._file.fileno(), WAV_HEADER_SIZE + data_size)
+                self._samples = np.ndarray(
+                    (self.frames, channels), dtype="<i2", buffer=self._mmap, offset=WAV_HEADER_SIZE
+                )
+        except BaseException:
+            self._file.close()
+            os.remove(self.temp_file)
+            raise
+
+    def write_line(self, index, source):
+        """
+        Écrit une ligne à son emplacement. Peut être appelée depuis plusieurs threads
+        (les emplacements ne se recouvrent pas).
+        :param index: Index de la ligne.
+        :param source: Chemin, contenu WAV (bytes) ou objet fichier de la ligne.
+        :return: Nombre de trames écrites.
+        """
+        offset, frames = self.slots[index]
+        target = self._samples[offset:offset + frames]
+        position = 0
+        for block in read_uniform_blocks(source, self.channels, self.sample_rate):
+            count = min(len(block), frames - position)
+            target[position:position + count] = block[:count]
+            position += count
+            if position >= frames:
+                break
+        target[position:] = 0
+        with self._lock:
+            self.written.add(index)
+        return position
+
+    @property
+    def complete(self):
+        """Indique si toutes les lignes ont été écrites."""
+        return len(self.written) == len(self.slots)
+
+    def close(self):
+        """
+        Écrit les données sur le disque et ferme le fichier. Le fichier temporaire remplace
+        output_file si toutes les lignes ont été écrites ; sinon il est supprimé.
+        """
+        if self._mmap is not None:
+            self._samples = None
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        if not self._file.closed:
+            self._file.close()
+            if self.complete:
+                os.replace(self.temp_file, self.output_file)
+                print(format_message(f"Audio final assemblé : {self.output_file}", "RÉUSSI"))
+            else:
+                os.remove(self.temp_file)
+
+    def info(self):
+        """WavInfo du fichier final."""
+        return WavInfo(self.frames, self.sample_rate, self.channels, 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
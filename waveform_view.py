@@ -0,0 +1,93 @@
+# waveform_view.py
+import numpy as np
+from PyQt6.QtCore import Qt, QLineF, QPointF
+from PyQt6.QtGui import QPainter, QColor, QPen
+from PyQt6.QtWidgets import QWidget
+
+
+class WaveformView(QWidget):
+    """
+    Forme d'onde d'un fichier audio, dessinée à partir de sa pyramide de pics (PeakPyramid) :
+    le zoom (molette) et le défilement (glisser) ne lisent jamais les échantillons.
+    L'intervalle affiché peut être limité à une ligne du morceau (set_range).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pyramid = None
+        self.start_frame = 0
+        self.end_frame = 0
+        self._drag_x = None
+        self.setMinimumHeight(80)
+
+    def set_pyramid(self, pyramid):
+        """Affiche un nouveau fichier, en entier."""
+        self.pyramid = pyramid
+        self.set_range(0, pyramid.frames if pyramid else 0)
+
+    def set_range(self, start_frame, end_frame):
+        """Limite l'affichage à un intervalle de trames (par exemple la place d'une ligne dans le morceau)."""
+        total = self.pyramid.frames if self.pyramid else 0
+        length = max(1, min(int(end_frame - start_frame), total))
+        start_frame = int(np.clip(start_frame, 0, max(0, total - length)))
+        self.start_frame, self.end_frame = start_frame, start_frame + length
+        self.update()
+
+    def set_time_range(self, start_seconds, end_seconds):
+        """Limite l'affichage à un intervalle exprimé en secondes."""
+        if self.pyramid:
+            rate = self.pyramid.sample_rate
+            self.set_range(int(round(start_seconds * rate)), int(round(end_seconds * rate)))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+        if not self.pyramid or self.end_frame <= self.start_frame:
+            return
+        width, height = self.width(), self.height()
+        mins, maxs = self.pyramid.window(self.start_frame, self.end_frame, width)
+        if len(mins) == 0:
+            return
+
+        # Une colonne verticale (min -> max) par point, répartie sur la largeur du widget
+        middle = height / 2
+        scale = middle / 32768.0
+        xs = np.linspace(0, width - 1, len(mins))
+        tops = middle - maxs.astype(np.float64) * scale
+        bottoms = middle - mins.astype(np.float64) * scale
+        painter.setPen(QPen(QColor(80, 200, 120)))
+        painter.drawLines([QLineF(QPointF(x, top), QPointF(x, bottom)) for x, top, bottom in zip(xs, tops, bottoms)])
+
+        painter.setPen(QPen(QColor(200, 200, 200)))
+        rate = self.pyramid.sample_rate
+        painter.drawText(
+            4, 14, f"{self.start_frame / rate:.2f} s - {self.end_frame / rate:.2f} s / {self.pyramid.duration:.2f} s"
+        )
+
+    def wheelEvent(self, event):
+        """Zoom autour de la position du pointeur."""
+        if not self.pyramid:
+            return
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        length = self.end_frame - self.start_frame
+        anchor = self.start_frame + length * event.position().x() / max(1, self.width())
+        new_length = max(self.pyramid.base_block, int(length * factor))
+        new_start = int(anchor - (anchor - self.start_frame) * new_length / length)
+        self.set_range(new_start, new_start + new_length)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_x = event.position().x()
+
+    def mouseMoveEvent(self, event):
+        """Défilement en faisant glisser la forme d'onde."""
+        if self._drag_x is None or not self.pyramid:
+            return
+        x = event.position().x()
+        frames_per_pixel = (self.end_frame - self.start_frame) / max(1, self.width())
+        shift = int((self._drag_x - x) * frames_per_pixel)
+        self._drag_x = x
+        self.set_range(self.start_frame + shift, self.end_frame + shift)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_x = None